@@ -1,8 +1,46 @@
 #!/usr/bin/env python
 
-from validictory.validator import SchemaValidator, ValidationError, SchemaError
+import sys
+from importlib import import_module
 
-__all__ = ['validate', 'SchemaValidator', 'ValidationError', 'SchemaError']
+from validictory.validator import (SchemaValidator, CompiledSchema, ErrorRecord,
+                                   ValidationError, SchemaError)
+
+# the names from modules that validating doesn't need, imported when first
+# used so that importing validictory stays cheap
+_LAZY = {
+    'SchemaCache': 'validictory.cache',
+    'FormatCache': 'validictory.cache',
+    'SubtreeMemo': 'validictory.cache',
+    'DiskCache': 'validictory.cache',
+    'schema_cache': 'validictory.cache',
+    'validate_many': 'validictory.batch',
+    'DocumentResult': 'validictory.batch',
+    'ValidationStats': 'validictory.profiling',
+    'Sampling': 'validictory.sampling',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module 'validictory' has no attribute '%s'" % name)
+    value = getattr(import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()).union(_LAZY))
+
+
+if sys.version_info < (3, 7):
+    # a module can't have a __getattr__ before python 3.7
+    for _name in _LAZY:
+        __getattr__(_name)
+
+__all__ = ['validate', 'validate_many', 'SchemaValidator', 'CompiledSchema',
+           'SchemaCache', 'FormatCache', 'SubtreeMemo', 'DiskCache', 'schema_cache', 'DocumentResult', 'ErrorRecord',
+           'ValidationStats', 'Sampling', 'ValidationError', 'SchemaError']
 __version__ = '0.8.0'
 
 
@@ -22,26 +60,14 @@ def validate(data, schema, validator_cls=SchemaValidator, default_location="_dat
     :param format_validators: optional dictionary of custom format validators
     :param required_by_default: defaults to True, set to False to make
         ``required`` schema attribute False by default.
+
+    The compiled schema is kept in :data:`schema_cache`, so repeated calls
+    with the same schema and options only prepare it once per process.
     '''
-    v = validator_cls(format_validators, required_by_default, blank_by_default)
-    return v.validate(data, schema, default_location)
-
-if __name__ == '__main__':
-    import sys
-    import json
-    if len(sys.argv) == 2:
-        if sys.argv[1] == "--help":
-            raise SystemExit("%s SCHEMAFILE [INFILE]" % (sys.argv[0],))
-        schemafile = open(sys.argv[1], 'rb')
-        infile = sys.stdin
-    elif len(sys.argv) == 3:
-        schemafile = open(sys.argv[1], 'rb')
-        infile = open(sys.argv[2], 'rb')
-    else:
-        raise SystemExit("%s SCHEMAFILE [INFILE]" % (sys.argv[0],))
-    try:
-        obj = json.load(infile)
-        schema = json.load(schemafile)
-        validate(obj, schema)
-    except ValueError as e:
-        raise SystemExit(e)
+    if not isinstance(schema, dict):
+        v = validator_cls(format_validators, required_by_default, blank_by_default)
+        return v.validate(data, schema, default_location)
+    from validictory.cache import schema_cache
+    compiled = schema_cache.get(schema, validator_cls, format_validators,
+                                required_by_default, blank_by_default)
+    return compiled.validate(data, default_location)
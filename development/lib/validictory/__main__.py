@@ -0,0 +1,194 @@
+import io
+import sys
+import json
+
+from validictory.validator import SchemaValidator, SchemaError, ValidationError
+from validictory.cache import DiskCache, default_cache_dir
+
+USAGE = "%s [--ndjson | --array] SCHEMAFILE [INFILE]"
+
+# bytes read from the input at a time when streaming
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+def iter_ndjson(infile):
+    '''
+    Yields the documents of a newline-delimited json file one at a time,
+    together with their line number. Blank lines are skipped.
+    '''
+    for lineno, line in enumerate(infile, 1):
+        if line.strip():
+            try:
+                yield lineno, json.loads(line)
+            except ValueError as e:
+                raise ValueError("line %d: %s" % (lineno, e))
+
+
+def iter_array(infile, read_size=READ_SIZE):
+    '''
+    Yields the elements of a json file holding a single top-level array one
+    at a time, together with their position, keeping only the element being
+    parsed in memory.
+    '''
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    expect = '['
+    index = 0
+
+    while True:
+        # skip whitespace, reading more input as needed
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("unexpected end of input after %d items" % index)
+            buf = infile.read(read_size)
+            pos = 0
+            eof = not buf
+            continue
+
+        char = buf[pos]
+        if expect == '[':
+            if char != '[':
+                raise ValueError("input is not a json array")
+            pos += 1
+            expect = 'first'
+        elif char == ']' and expect in ('first', ','):
+            return
+        elif expect == ',':
+            if char != ',':
+                raise ValueError("expected ',' or ']' after item %d" % (index - 1))
+            pos += 1
+            expect = 'item'
+        else:
+            # decode one item, reading more when it runs past the buffer (a
+            # number that is only followed by number characters may also
+            # be incomplete); the buffer is only cut when more is read, at
+            # least as much as the item already holds so that a long item
+            # is only decoded again a logarithmic number of times
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    stop = end
+                    while stop < len(buf) and buf[stop] in _NUMBER_CHARS:
+                        stop += 1
+                    if eof or stop < len(buf):
+                        break
+                except ValueError:
+                    if eof:
+                        raise ValueError("invalid json in item %d" % index)
+                more = infile.read(max(read_size, len(buf) - pos))
+                buf = buf[pos:] + more
+                pos = 0
+                eof = not more
+
+            yield index, item
+            index += 1
+            pos = end
+            expect = ','
+
+
+def load_schema(schemafile, mode=None):
+    '''
+    Reads the schema in ``schemafile``, or in ``--array`` mode the part of
+    it the items of the array are validated against.
+    '''
+    with io.open(schemafile, encoding='utf-8') as f:
+        return _select(json.load(f), mode)
+
+
+def _select(schema, mode):
+    if mode == '--array':
+        # the array itself is never held in memory, so only its 'items'
+        # schema can be checked
+        schema = schema.get('items')
+        if not isinstance(schema, dict):
+            raise SchemaError("--array needs a schema whose 'items' is an object")
+    return schema
+
+
+def load_compiled(schemafile, mode=None, cache=None):
+    '''
+    Returns the compiled schema :func:`load_schema` would read, from the
+    :class:`~validictory.cache.DiskCache` ``cache`` when it holds it.
+    '''
+    if cache is None:
+        return SchemaValidator().compile(load_schema(schemafile, mode))
+
+    with io.open(schemafile, 'rb') as f:
+        source = f.read()
+    compiled = cache.get(source, mode)
+    if compiled is None:
+        schema = _select(json.loads(source.decode('utf-8')), mode)
+        compiled = cache.validator.compile(schema)
+        cache.put(source, compiled, mode)
+    return compiled
+
+
+def check(compiled, infile, mode, report):
+    '''
+    Validates the input against a compiled schema. In ``--ndjson`` and
+    ``--array`` mode ``report(label, number, error)`` is called for every
+    invalid record and the number of invalid records is returned;
+    otherwise the error of the single document is raised.
+    '''
+    if mode is None:
+        compiled.validate(json.load(infile))
+        return 0
+
+    if mode == '--ndjson':
+        records = iter_ndjson(infile)
+        label = 'line'
+    else:
+        records = iter_array(infile)
+        label = 'item'
+
+    failures = 0
+    for number, record in records:
+        try:
+            compiled.validate(record)
+        except ValidationError as e:
+            failures += 1
+            report(label, number, e)
+    return failures
+
+
+def _report(label, number, error):
+    sys.stderr.write("%s %d: %s\n" % (label, number, error))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    usage = USAGE % (argv[0],)
+
+    args = argv[1:]
+    mode = None
+    if args and args[0] in ('--ndjson', '--array'):
+        mode = args.pop(0)
+    if len(args) == 1:
+        if args[0] == "--help":
+            raise SystemExit(usage)
+        infile = sys.stdin
+    elif len(args) == 2:
+        infile = io.open(args[1], encoding='utf-8')
+    else:
+        raise SystemExit(usage)
+
+    try:
+        directory = default_cache_dir()
+        cache = DiskCache(directory) if directory else None
+        compiled = load_compiled(args[0], mode, cache)
+        failures = check(compiled, infile, mode, _report)
+        if failures:
+            raise SystemExit("%d invalid records" % failures)
+    except ValueError as e:
+        raise SystemExit(e)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+'''
+Validation that cooperates with an asyncio event loop.
+
+:func:`validate` walks the document like :meth:`SchemaValidator.validate`
+does, raising the same error, but gives control back to the event loop
+every few nodes so that a large document doesn't hold up everything else
+the loop is running. It can be cancelled and given a timeout, and very
+large documents can be handed to an executor instead. It runs the steps
+of :mod:`validictory.iterative` on an explicit stack, like
+:meth:`SchemaValidator.validate` does for deeply nested schemas, so
+documents can be nested deeper than the recursion limit.
+
+This module needs Python 3.5 or later and isn't imported by
+:mod:`validictory`, import it (or use
+:meth:`SchemaValidator.validate_async`) when needed.
+'''
+import asyncio
+from timeit import default_timer as timer
+
+from validictory import iterative
+from validictory.validator import SchemaValidator, _GENERATOR, _PAUSE
+
+# nodes validated between two yields to the event loop
+EVERY = 1000
+
+# the synchronous methods the steps of validictory.iterative reproduce; a
+# validator overriding one of them is run synchronously instead
+_REPRODUCED = ('validate', '_validate')
+
+
+class _Budget(object):
+    # decides when the walk yields to the event loop
+
+    __slots__ = ('every', 'interval', 'left', 'since')
+
+    def __init__(self, every, interval):
+        self.every = every
+        self.interval = interval
+        self.left = every
+        self.since = timer()
+
+    def spent(self, nodes):
+        self.left -= nodes
+        if self.left > 0 and (self.interval is None or
+                              timer() - self.since < self.interval):
+            return False
+        self.left = self.every
+        self.since = timer()
+        return True
+
+
+async def validate(validator, data, schema, every=EVERY, interval=None,
+                   timeout=None, executor=None, offload_nodes=None):
+    '''
+    Validates a piece of json data against the provided json-schema,
+    raising the :class:`ValidationError` that
+    :meth:`SchemaValidator.validate` would raise.
+
+    :param every: number of nodes to validate before yielding to the event
+        loop; the values with no subschemas to descend into are counted
+        :data:`~validictory.iterative.PAUSE_EVERY` at a time
+    :param interval: optional number of seconds after which to yield even
+        if ``every`` nodes weren't validated yet
+    :param timeout: optional number of seconds after which to give up with
+        :class:`asyncio.TimeoutError`
+    :param executor: optional :class:`concurrent.futures.Executor` to
+        validate large documents in; a validation already running there
+        can't be interrupted by a cancellation or timeout
+    :param offload_nodes: number of nodes from which a document is
+        validated in ``executor`` (all documents when not given)
+    '''
+    loop = asyncio.get_event_loop()
+    if executor is not None and (offload_nodes is None or
+                                 _has_nodes(data, offload_nodes)):
+        work = loop.run_in_executor(executor, validator.validate, data, schema)
+    else:
+        work = _walk(validator, data, schema, every, interval)
+    if timeout is not None:
+        await asyncio.wait_for(work, timeout)
+    else:
+        await work
+
+
+def _has_nodes(data, count):
+    # whether data holds at least ``count`` json values, without counting
+    # further than that
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        count -= 1
+        if count <= 0:
+            return True
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+async def _walk(validator, data, schema, every, interval):
+    validator_cls = type(validator)
+    for name in _REPRODUCED:
+        if getattr(validator_cls, name) is not getattr(SchemaValidator, name):
+            validator.validate(data, schema)
+            return
+
+    if schema is not None:
+        schema = validator._compiled(schema)
+    await _run_steps(iterative._validate(validator, data, schema, ""),
+                     _Budget(every, interval))
+
+
+async def _run_steps(steps, budget):
+    # validictory.validator._run_steps, yielding to the event loop whenever
+    # the budget is spent: a step counts as one node, a _PAUSE as the
+    # children its walker validated without a step of their own
+    stack = [steps]
+    value = None
+    error = None
+    try:
+        while stack:
+            try:
+                if error is not None:
+                    step = stack[-1].throw(error)
+                    error = None
+                else:
+                    step = stack[-1].send(value)
+            except StopIteration:
+                stack.pop()
+                value = None
+                continue
+            except Exception as e:
+                stack.pop()
+                if not stack:
+                    raise
+                error = e
+                value = None
+                continue
+            value = None
+            if type(step) is _GENERATOR:
+                stack.append(step)
+                nodes = 1
+            elif step is _PAUSE:
+                nodes = iterative.PAUSE_EVERY
+            else:
+                stack.pop().close()
+                value = step
+                continue
+            if budget.spent(nodes):
+                await asyncio.sleep(0)
+    finally:
+        while stack:
+            stack.pop().close()
+
+__all__ = ['validate']
@@ -0,0 +1,152 @@
+from collections import namedtuple
+
+from validictory.validator import SchemaValidator
+
+
+class DocumentResult(namedtuple('DocumentResult', ['index', 'errors', 'samples'])):
+    '''
+    Outcome of validating one document of a batch: its position in the
+    input, the list of :class:`ErrorRecord` found (empty when valid) and
+    the :class:`~validictory.sampling.SampleReport` of the arrays that were
+    only sampled (empty when the whole document was checked).
+    '''
+
+    __slots__ = ()
+
+    def __new__(cls, index, errors, samples=()):
+        return super(DocumentResult, cls).__new__(cls, index, errors, samples)
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    @property
+    def sampled(self):
+        '''
+        Whether only part of the document was checked, so that it still
+        needs a full validation.
+        '''
+        return bool(self.samples)
+
+
+# compiled schema of a worker process, set up once by _init_worker
+_worker_schema = None
+_worker_max_errors = None
+
+
+def _validator(validator_args):
+    # options are only passed when given, for validator classes that
+    # don't know about them
+    validator_cls, format_validators, required_by_default, blank_by_default, options = validator_args
+    return validator_cls(format_validators, required_by_default, blank_by_default,
+                         **options)
+
+
+def _init_worker(schema, validator_args, max_errors):
+    global _worker_schema, _worker_max_errors
+    _worker_schema = _validator(validator_args).compile(schema)
+    _worker_max_errors = max_errors
+
+
+def _validate_chunk(chunk):
+    results = [_check(_worker_schema, index, doc, _worker_max_errors)
+               for index, doc in chunk]
+    sample = _worker_schema.validator.sample
+    if sample is not None:
+        # the reports went back with the results
+        sample.reset()
+    return results
+
+
+def _check(compiled, index, doc, max_errors):
+    sample = compiled.validator.sample
+    if sample is None:
+        errors = compiled.validator.iter_errors(doc, compiled, max_errors)
+        return DocumentResult(index, list(errors))
+    start = len(sample.reports)
+    errors = list(compiled.validator.iter_errors(doc, compiled, max_errors))
+    return DocumentResult(index, errors, sample.reports[start:])
+
+
+def _chunks(docs, chunksize):
+    chunk = []
+    for item in enumerate(docs):
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_many(docs, schema, workers=None, chunksize=64, ordered=True,
+                  max_errors=None, validator_cls=SchemaValidator,
+                  format_validators=None, required_by_default=True,
+                  blank_by_default=False, sample=None, memo=None):
+    '''
+    Validates every document of an iterable against the same schema,
+    spreading the work over a pool of processes.
+
+    The schema is compiled once in this process (so a :class:`SchemaError`
+    is raised before anything is started) and handed to each worker once,
+    when the worker starts. Documents are sent to the workers in chunks.
+
+    Returns an iterator of a :class:`DocumentResult` per document; the
+    workers are started when it is first advanced.
+
+    :param docs: iterable of parsed json documents
+    :param schema: python dictionary representing the schema
+    :param workers: number of worker processes, defaults to the number of
+        CPUs; 1 validates in the current process
+    :param chunksize: number of documents sent to a worker at a time
+    :param ordered: yield results in input order (the default) or as soon
+        as their chunk completes
+    :param max_errors: optional maximum number of errors to report per
+        document
+    :param sample: optional :class:`~validictory.sampling.Sampling` to only
+        check a sample of the long arrays of the documents; each worker
+        process gets its own copy of it, the reports of a document are in
+        its result
+    :param memo: optional :class:`~validictory.cache.SubtreeMemo` so that
+        subtrees repeated across the documents are only checked once; each
+        worker process gets an empty one of the same size
+
+    The remaining parameters are those of :func:`validictory.validate`.
+
+    With more than one worker the schema and the documents are pickled to
+    the workers, which fails for those nested deeper than the recursion
+    limit; validate them with ``workers=1``.
+    '''
+    options = dict((name, option) for name, option in (('sample', sample), ('memo', memo))
+                   if option is not None)
+    validator_args = (validator_cls, format_validators, required_by_default,
+                      blank_by_default, options)
+    compiled = _validator(validator_args).compile(schema)
+
+    if workers is None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        return (_check(compiled, index, doc, max_errors) for index, doc in enumerate(docs))
+    return _pooled(docs, schema, validator_args, workers, chunksize, ordered, max_errors)
+
+
+def _pooled(docs, schema, validator_args, workers, chunksize, ordered, max_errors):
+    import multiprocessing
+    pool = multiprocessing.Pool(workers, _init_worker,
+                                (schema, validator_args, max_errors))
+    try:
+        if ordered:
+            results = pool.imap(_validate_chunk, _chunks(docs, chunksize))
+        else:
+            results = pool.imap_unordered(_validate_chunk, _chunks(docs, chunksize))
+        for chunk in results:
+            for result in chunk:
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+__all__ = ['validate_many', 'DocumentResult']
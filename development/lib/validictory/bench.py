@@ -0,0 +1,273 @@
+'''
+Benchmarks for the validator.
+
+Runs a fixed set of cases: the schemas shipped with the Forge tools against
+the app's config files, plus synthetic documents whose size grows with
+``--scale``. For each case it reports the median time of a validation, the
+documents and nodes validated per second, and the peak memory allocated
+while validating once (when tracemalloc is available).
+
+    python -m validictory.bench [--scale N] [--repeat N] [--json FILE]
+                                [--baseline FILE] [--threshold FRACTION]
+
+With ``--baseline`` the medians are compared against a JSON file written
+earlier with ``--json``, and the run exits with a non-zero status when a
+case got slower than the baseline by more than the threshold.
+'''
+import gc
+import io
+import os
+import re
+import json
+from timeit import default_timer as timer
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from validictory.validator import SchemaValidator, ValidationError
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_LIB = os.path.dirname(_HERE)
+_ROOT = os.path.dirname(os.path.dirname(_LIB))
+
+# the Forge config files allow trailing commas
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def load_json(path):
+    with io.open(path, encoding='utf-8') as f:
+        return json.loads(_TRAILING_COMMA.sub(r'\1', f.read()))
+
+
+def count_nodes(data):
+    '''
+    Returns the number of json values in ``data``, containers included.
+    '''
+    count = 0
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        count += 1
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return count
+
+
+class Case(object):
+    '''
+    A benchmark case: a document and the schema to validate it against.
+    '''
+
+    def __init__(self, name, schema, data):
+        self.name = name
+        self.schema = schema
+        self.data = data
+
+    def run(self, compiled):
+        try:
+            compiled.validate(self.data)
+        except ValidationError:
+            pass
+
+
+def shipped_cases():
+    cases = []
+    pairs = [('forge-config', os.path.join(_LIB, 'schema.json'),
+              os.path.join(_ROOT, 'src', 'config.json')),
+             ('local-config', os.path.join(_LIB, 'local_config_schema.json'),
+              os.path.join(_ROOT, 'local_config.json'))]
+    for name, schemafile, datafile in pairs:
+        if os.path.exists(schemafile) and os.path.exists(datafile):
+            cases.append(Case(name, load_json(schemafile), load_json(datafile)))
+    return cases
+
+
+def synthetic_cases(scale):
+    cases = []
+
+    depth = 50 * scale
+    schema = data = None
+    for level in range(depth):
+        schema = {"type": "object", "properties": {"child": schema or {"type": "integer"}}}
+        data = {"child": data if data is not None else level}
+    cases.append(Case('deep-nesting', schema, data))
+
+    # deeper than the recursion limit, validated on an explicit stack
+    depth = 10000 * scale
+    schema = data = None
+    for level in range(depth):
+        schema = {"type": "object", "properties": {"child": schema or {"type": "integer"}}}
+        data = {"child": data if data is not None else level}
+    cases.append(Case('deep-nesting-10k', schema, data))
+
+    width = 2000 * scale
+    cases.append(Case('wide-shallow',
+                      {"type": "object",
+                       "additionalProperties": {"type": "object",
+                                                "properties": {"x": {"type": "integer"},
+                                                               "y": {"type": "integer"}}}},
+                      dict(("point%d" % i, {"x": i, "y": -i}) for i in range(width))))
+
+    width = 1000 * scale
+    cases.append(Case('wide-object',
+                      {"type": "object",
+                       "properties": dict(("field%d" % i, {"type": "string", "maxLength": 20})
+                                          for i in range(width))},
+                      dict(("field%d" % i, "value %d" % i) for i in range(width))))
+
+    length = 10000 * scale
+    cases.append(Case('long-items',
+                      {"type": "array",
+                       "items": {"type": "object",
+                                 "properties": {"id": {"type": "integer", "minimum": 0},
+                                                "name": {"type": "string"},
+                                                "score": {"type": "number", "maximum": 100},
+                                                "kind": {"enum": ["a", "b", "c"]}}}},
+                      [{"id": i, "name": "item %d" % i, "score": i % 100, "kind": "abc"[i % 3]}
+                       for i in range(length)]))
+
+    patterns = 50
+    keys = 1000 * scale
+    cases.append(Case('pattern-properties',
+                      {"type": "object",
+                       "patternProperties": dict(("^p%d_" % i, {"type": "integer"})
+                                                 for i in range(patterns))},
+                      dict(("p%d_%d" % (i % patterns, i), i) for i in range(keys))))
+
+    length = 2000 * scale
+    cases.append(Case('unique-objects',
+                      {"type": "array", "uniqueItems": True},
+                      [{"id": i, "tags": ["x", "y"]} for i in range(length)]))
+
+    length = 2000 * scale
+    cases.append(Case('formats',
+                      {"type": "array",
+                       "items": {"type": "object",
+                                 "properties": {"at": {"type": "string", "format": "date-time"},
+                                                "on": {"type": "string", "format": "date"}}}},
+                      [{"at": "2012-05-%02dT10:%02d:00Z" % (i % 28 + 1, i % 60),
+                        "on": "2012-05-%02d" % (i % 28 + 1)}
+                       for i in range(length)]))
+    return cases
+
+
+def measure(case, repeat):
+    '''
+    Returns the timings and memory use of a case as a dictionary.
+    '''
+    validator = SchemaValidator()
+
+    start = timer()
+    compiled = validator.compile(case.schema)
+    compile_time = timer() - start
+
+    case.run(compiled)  # warm up
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = timer()
+            case.run(compiled)
+            times.append(timer() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    times.sort()
+    median = times[len(times) // 2]
+
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            case.run(compiled)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    nodes = count_nodes(case.data)
+    return {
+        'median': median,
+        'min': times[0],
+        'compile': compile_time,
+        'nodes': nodes,
+        'docs_per_sec': 1.0 / median if median else None,
+        'nodes_per_sec': nodes / median if median else None,
+        'peak_memory': peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    '''
+    Returns the (name, baseline median, median) of the cases that are
+    slower than the baseline by more than ``threshold`` (a fraction).
+    '''
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before and result['median'] > before['median'] * (1 + threshold):
+            regressions.append((name, before['median'], result['median']))
+    return regressions
+
+
+def format_table(results):
+    lines = ['%-20s %12s %12s %14s %12s' % ('case', 'median ms', 'docs/s',
+                                             'nodes/s', 'peak KiB')]
+    for name, result in sorted(results.items()):
+        if result['peak_memory'] is None:
+            # no tracemalloc (python 2)
+            peak = 'n/a'
+        else:
+            peak = '%.1f' % (result['peak_memory'] / 1024.0)
+        lines.append('%-20s %12.3f %12.1f %14.0f %12s' % (
+            name, result['median'] * 1000, result['docs_per_sec'] or 0,
+            result['nodes_per_sec'] or 0, peak))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m validictory.bench',
+                                     description='Benchmark the validator.')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='size multiplier for the synthetic documents')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='timed runs per case (the median is kept)')
+    parser.add_argument('--case', action='append',
+                        help='only run the named case (can be repeated)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    cases = shipped_cases() + synthetic_cases(args.scale)
+    if args.case:
+        cases = [case for case in cases if case.name in args.case]
+
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, args.repeat)
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print('%s: %.3f ms -> %.3f ms' % (name, before * 1000, after * 1000))
+        if regressions:
+            raise SystemExit('%d cases slower than the baseline' % len(regressions))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,559 @@
+import os
+import sys
+import threading
+from collections import namedtuple, OrderedDict
+
+from validictory.validator import (SchemaValidator, CompiledSchema, FIELD_WILDCARD, _scalar_types,
+                                   _subschema_map)
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def schema_digest(schema):
+    '''
+    Returns a hash of the content of ``schema``, key order included, since
+    it decides which error is reported.
+    '''
+    import hashlib
+    try:
+        text = repr(schema)
+    except RuntimeError:
+        # nested deeper than repr can go (RecursionError is a RuntimeError)
+        text = _deep_repr(schema)
+    return hashlib.sha1(text.encode('utf-8', 'backslashreplace')).hexdigest()
+
+
+def _deep_repr(value):
+    # the text repr(value) gives, written on an explicit stack; the stack
+    # holds (is_text, value) pairs
+    parts = []
+    stack = [(False, value)]
+    while stack:
+        is_text, value = stack.pop()
+        if is_text:
+            parts.append(value)
+            continue
+        value_type = type(value)
+        if value_type is dict:
+            pending = []
+            separator = '{'
+            for key, item in value.items():
+                pending.append((True, separator + repr(key) + ': '))
+                pending.append((False, item))
+                separator = ', '
+            closing = '}'
+        elif value_type is list or value_type is tuple:
+            pending = []
+            separator = '[' if value_type is list else '('
+            for item in value:
+                pending.append((True, separator))
+                pending.append((False, item))
+                separator = ', '
+            closing = ']' if value_type is list else (',)' if len(value) == 1 else ')')
+        else:
+            parts.append(repr(value))
+            continue
+        if not pending:
+            parts.append(separator)
+        stack.append((True, closing))
+        stack.extend(reversed(pending))
+    return ''.join(parts)
+
+
+class SchemaCache(object):
+    '''
+    Bounded, thread-safe LRU cache of compiled schemas.
+
+    Entries are keyed by the content of the schema, in its key order,
+    together with the options the validator was created with, so passing
+    an equal schema (even a freshly parsed copy) reuses the work done the
+    first time. The content is hashed on every call, a schema changed in
+    place gets an entry of its own.
+    Schemas compiled with the same options are compiled by the same
+    validator, so the subschemas they have in common are shared.
+
+    :param maxsize: maximum number of compiled schemas to keep
+    '''
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, schema, validator_cls=SchemaValidator, format_validators=None,
+            required_by_default=True, blank_by_default=False):
+        '''
+        Returns the compiled form of ``schema`` for a validator built with
+        the given options, compiling and caching it if necessary.
+        '''
+        if format_validators is None:
+            formats_key = None
+        else:
+            formats_key = tuple(sorted((name, id(fun)) for name, fun
+                                       in format_validators.items()))
+        options = (validator_cls, formats_key, required_by_default, blank_by_default)
+        key = (schema_digest(schema),) + options
+
+        with self._lock:
+            compiled = self._entries.pop(key, None)
+            if compiled is not None:
+                self._entries[key] = compiled
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            validator = self._validators.get(options)
+
+        if validator is None:
+            if format_validators is not None:
+                # keep our own copy so later changes to the caller's
+                # dictionary can't make the entry disagree with its key
+                format_validators = dict(format_validators)
+            validator = validator_cls(format_validators, required_by_default,
+                                      blank_by_default)
+            with self._lock:
+                validator = self._validators.setdefault(options, validator)
+        compiled = validator.compile(schema)
+
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def info(self):
+        '''
+        Returns a :class:`CacheInfo` with the hit/miss counts and size.
+        '''
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._entries))
+
+    def clear(self):
+        '''
+        Drops every cached schema and resets the statistics.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self._validators.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class FormatCache(object):
+    '''
+    Bounded, thread-safe LRU cache of the values that passed a format
+    validator, for documents repeating the same timestamps or
+    identifiers many times. Give it to a :class:`SchemaValidator` as its
+    ``format_cache``.
+
+    Only passing values are remembered: a failing value is checked again
+    each time, so that the error names the field it was found in.
+
+    :param maxsize: maximum number of values to remember
+    '''
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def validate(self, format_validator, validator, fieldname, value, format_option):
+        '''
+        Calls ``format_validator`` unless ``value`` recently passed it for
+        ``format_option``.
+        '''
+        # the function is part of the key, validators sharing the cache can
+        # check a format differently; and so is the type, 1, 1.0 and True
+        # are different values
+        key = (format_validator, format_option, type(value), value)
+        try:
+            with self._lock:
+                if self._entries.pop(key, False):
+                    self._entries[key] = True
+                    self.hits += 1
+                    return
+                self.misses += 1
+        except TypeError:
+            # unhashable values aren't cached
+            format_validator(validator, fieldname, value, format_option)
+            return
+
+        format_validator(validator, fieldname, value, format_option)
+
+        with self._lock:
+            self._entries[key] = True
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        '''
+        Returns a :class:`CacheInfo` with the hit/miss counts and size.
+        '''
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._entries))
+
+    def clear(self):
+        '''
+        Drops every remembered value and resets the statistics.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_LEAF_TYPES = _scalar_types | frozenset([float])
+_CONTAINER_TYPES = frozenset([dict, list, tuple])
+
+
+def _children(container):
+    if type(container) is dict:
+        return container.values()
+    return container
+
+
+def _piece(value, known):
+    # stands for value in the text of its container, whose digest is known
+    # by then if value is a container itself
+    value_type = type(value)
+    if value_type in _LEAF_TYPES:
+        return repr(value)
+    if value_type in _CONTAINER_TYPES:
+        return '#' + known[id(value)][1]
+    raise TypeError("can't fingerprint %r" % (value,))
+
+
+class SubtreeMemo(object):
+    '''
+    Bounded, thread-safe LRU table of the document subtrees (objects and
+    arrays) that passed a compiled subschema, so that a subtree repeated
+    within a document or across documents is only validated once. Give it
+    to a :class:`SchemaValidator` as its ``memo``.
+
+    Subtrees are identified by a SHA-1 of their content, computed bottom-up
+    once per document, which tells apart 1, 1.0 and True. Subtrees holding
+    anything but json values aren't remembered.
+
+    The result of a subschema with ``dependencies`` or ``requires`` depends
+    on the object holding the field, so those subschemas are always checked
+    (their own subschemas are still remembered). Fields are only looked up
+    when present, so ``required`` is unaffected. Like :class:`FormatCache`,
+    only passing subtrees are remembered, and format validators must only
+    depend on the value they are given.
+
+    :param maxsize: maximum number of subtrees to remember
+    '''
+
+    def __init__(self, maxsize=4096):
+        import hashlib
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sha1 = hashlib.sha1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __reduce__(self):
+        # worker processes get an empty table of their own
+        return (SubtreeMemo, (self.maxsize,))
+
+    def enter(self):
+        '''
+        Starts validating a document, or a part of the one being validated.
+        '''
+        # fingerprints are kept by id until the outermost validation ends,
+        # with the subtree itself so that its id can't be reused meanwhile
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if not depth:
+            local.known = {}
+        local.depth = depth + 1
+
+    def leave(self):
+        local = self._local
+        local.depth -= 1
+        if not local.depth:
+            local.known = None
+
+    def key(self, schema, data, fieldname):
+        '''
+        Returns the key of the field ``fieldname`` of ``data`` for the
+        compiled ``schema``, or None if it can't be remembered.
+        '''
+        if (fieldname == FIELD_WILDCARD or schema.contextual or
+                not isinstance(data, dict) or fieldname not in data):
+            return None
+        value = data[fieldname]
+        if type(value) not in _CONTAINER_TYPES:
+            # cheaper to check than to look up
+            return None
+        try:
+            return (schema._serial, self._fingerprint(value, self._local.known))
+        except TypeError:
+            return None
+
+    def _fingerprint(self, value, known):
+        # a digest of the repr of the leaves (which tells the json types
+        # apart) and of the digests of the containers below, computed on an
+        # explicit stack so that deep subtrees don't hit the recursion limit
+        entry = known.get(id(value))
+        if entry is not None:
+            return entry[1]
+        stack = [(value, False)]
+        # the containers whose children are being fingerprinted
+        open_ids = set()
+        while stack:
+            container, expanded = stack[-1]
+            if id(container) in known:
+                stack.pop()
+                continue
+            if not expanded:
+                stack[-1] = (container, True)
+                open_ids.add(id(container))
+                for item in _children(container):
+                    if type(item) in _CONTAINER_TYPES and id(item) not in known:
+                        if id(item) in open_ids:
+                            raise TypeError("can't fingerprint a container holding itself")
+                        stack.append((item, False))
+                continue
+            stack.pop()
+            open_ids.discard(id(container))
+            container_type = type(container)
+            if container_type is dict:
+                pieces = []
+                for key, item in container.items():
+                    if type(key) not in _LEAF_TYPES:
+                        raise TypeError("can't fingerprint %r" % (key,))
+                    pieces.append(repr(key))
+                    pieces.append(_piece(item, known))
+            else:
+                pieces = [_piece(item, known) for item in container]
+            text = container_type.__name__ + '(' + ','.join(pieces)
+            digest = self._sha1(text.encode('utf-8', 'backslashreplace')).hexdigest()
+            known[id(container)] = (container, digest)
+        return known[id(value)][1]
+
+    def passed(self, key):
+        '''
+        Returns whether the subtree of ``key`` recently passed.
+        '''
+        with self._lock:
+            if self._entries.pop(key, False):
+                self._entries[key] = True
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        '''
+        Remembers that the subtree of ``key`` passed.
+        '''
+        with self._lock:
+            self._entries[key] = True
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        '''
+        Returns a :class:`CacheInfo` with the hit/miss counts and size.
+        '''
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._entries))
+
+    def clear(self):
+        '''
+        Forgets every subtree and resets the statistics.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# version of the layout of the files written by DiskCache
+_DISK_FORMAT = 1
+
+
+def default_cache_dir():
+    '''
+    Returns the directory :class:`DiskCache` uses by default:
+    ``VALIDICTORY_CACHE_DIR`` when set (an empty value disables the cache
+    and returns None), otherwise ``validictory`` in the user's cache
+    directory.
+    '''
+    directory = os.environ.get('VALIDICTORY_CACHE_DIR')
+    if directory is not None:
+        return directory or None
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'validictory')
+
+
+class DiskCache(object):
+    '''
+    Compiled schemas stored in a directory, so that a new process can load
+    the prepared form of a schema file with :mod:`marshal` instead of
+    parsing and compiling it again.
+
+    Entries are keyed by the content of the schema file, a ``variant``
+    naming the part of it that was compiled, the validictory and python
+    versions and the options of the validator. Files that can't be read or
+    written are ignored, the schema is then simply compiled as usual.
+
+    :param directory: where to keep the files, see :func:`default_cache_dir`
+    :param validator: the :class:`SchemaValidator` the loaded schemas are
+        bound to, a default one if not given
+    '''
+
+    def __init__(self, directory=None, validator=None):
+        if directory is None:
+            directory = default_cache_dir()
+        if validator is None:
+            validator = SchemaValidator()
+        self.directory = directory
+        self.validator = validator
+
+    def _header(self, variant):
+        from validictory import __version__
+        validator_cls = type(self.validator)
+        return (_DISK_FORMAT, __version__, tuple(sys.version_info[:2]),
+                validator_cls.__module__ + '.' + validator_cls.__name__,
+                self.validator.required_by_default,
+                self.validator.blank_by_default, variant)
+
+    def _filename(self, source, header):
+        import zlib
+        digest = zlib.crc32(repr(header).encode('utf-8'))
+        digest = zlib.crc32(source, digest) & 0xffffffff
+        return os.path.join(self.directory, '%08x-%d.marshal' % (digest, len(source)))
+
+    def get(self, source, variant=None):
+        '''
+        Returns the compiled schema stored for the schema file content
+        ``source`` (bytes), or None.
+        '''
+        import marshal
+        header = self._header(variant)
+        try:
+            with open(self._filename(source, header), 'rb') as f:
+                entry = marshal.loads(f.read())
+        except (EnvironmentError, EOFError, ValueError, TypeError):
+            return None
+        # the file name is only a checksum, the entry holds the real key
+        if entry[0] != header or entry[1] != source:
+            return None
+        return _restore(entry[2], self.validator)
+
+    def put(self, source, compiled, variant=None):
+        '''
+        Stores ``compiled``, the schema compiled from the schema file
+        content ``source`` (bytes).
+        '''
+        import marshal
+        import tempfile
+        header = self._header(variant)
+        try:
+            data = marshal.dumps((header, source, _flatten(compiled)))
+        except (TypeError, ValueError):
+            return
+        filename = self._filename(source, header)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmpname = tempfile.mkstemp(dir=self.directory)
+        except EnvironmentError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(tmpname, filename)
+        except EnvironmentError:
+            try:
+                os.remove(tmpname)
+            except EnvironmentError:
+                pass
+
+
+def _flatten(compiled):
+    # lists every compiled schema reachable from ``compiled`` as (path,
+    # source schema, items), where the compiled subschemas found in the
+    # items are replaced by (index,) and the items holding some are flagged
+    nodes = [compiled]
+    index = {id(compiled): 0}
+
+    def encode(value):
+        if isinstance(value, CompiledSchema):
+            if id(value) not in index:
+                index[id(value)] = len(nodes)
+                nodes.append(value)
+            return (index[id(value)],), True
+        if isinstance(value, dict):
+            encoded = [(key,) + encode(item) for key, item in value.items()]
+            if any(refs for _, _, refs in encoded):
+                return dict((key, item) for key, item, _ in encoded), True
+        elif type(value) is list:
+            encoded = [encode(item) for item in value]
+            if any(refs for _, refs in encoded):
+                return [item for item, _ in encoded], True
+        elif type(value) is tuple:
+            # would be mistaken for a reference
+            raise TypeError("can't store tuples")
+        return value, False
+
+    records = []
+    position = 0
+    while position < len(nodes):
+        node = nodes[position]
+        items = [(key,) + encode(value) for key, value in node.items()]
+        records.append((node.path, node.schema, items))
+        position += 1
+    return records
+
+
+def _restore(records, validator):
+    nodes = [CompiledSchema(validator, source, path) for path, source, _ in records]
+
+    def decode(value, source):
+        if type(value) is tuple:
+            return nodes[value[0]]
+        if type(value) is dict:
+            # a map of subschemas, in the order of its definition
+            return _subschema_map(source, [(key, decode(value[key], None))
+                                           for key in source])
+        if type(value) is list:
+            return [decode(item, None) for item in value]
+        return value
+
+    for node, (_, source, items) in zip(nodes, records):
+        # the keys in the order compiling gives them
+        dict.update(node, source)
+        for key, value, refs in items:
+            node[key] = decode(value, source.get(key)) if refs else value
+    memo = {}
+    for node in nodes:
+        validator._prepare_checks(node, memo)
+    return nodes[0]
+
+
+# the cache of validictory.validate
+schema_cache = SchemaCache()
+
+__all__ = ['SchemaCache', 'FormatCache', 'SubtreeMemo', 'DiskCache', 'CacheInfo', 'schema_digest',
+           'default_cache_dir', 'schema_cache']
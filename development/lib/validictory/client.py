@@ -0,0 +1,95 @@
+'''
+Client of the validation daemon (:mod:`validictory.daemon`), taking the
+same arguments as ``python -m validictory``:
+
+    python -m validictory.client [--ndjson | --array] SCHEMAFILE [INFILE]
+
+The input is sent to the daemon, which validates it against its already
+loaded copy of SCHEMAFILE; errors are printed and the exit status set as
+the command line validator would. The daemon's socket is given by the
+``VALIDICTORY_SOCKET`` environment variable, see :func:`default_socket`.
+
+Only the standard library is used, so this file can also be run directly
+as a script to avoid importing the validator at all.
+'''
+import io
+import os
+import sys
+import json
+import socket
+import tempfile
+
+USAGE = "%s [--ndjson | --array] SCHEMAFILE [INFILE]"
+
+
+def default_socket():
+    '''
+    Returns the path of the daemon's socket: ``VALIDICTORY_SOCKET`` if set,
+    otherwise a file named after the user in the temporary directory.
+    '''
+    path = os.environ.get('VALIDICTORY_SOCKET')
+    if path:
+        return path
+    return os.path.join(tempfile.gettempdir(), 'validictory-%d.sock' % os.getuid())
+
+
+def request(schemafile, text, mode=None, path=None):
+    '''
+    Asks the daemon listening on ``path`` to validate the json ``text``
+    against the schema in ``schemafile``, and returns its reply: a
+    dictionary with the list of ``errors`` found (each with the ``label``
+    and ``number`` of the record, ``path``, ``keyword`` and ``message``)
+    and the ``exit`` message of the command line validator, or None.
+    '''
+    message = json.dumps({'schema': os.path.abspath(schemafile),
+                          'mode': mode, 'input': text})
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or default_socket())
+        sock.sendall(message.encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(64 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    usage = USAGE % (argv[0],)
+
+    args = argv[1:]
+    mode = None
+    if args and args[0] in ('--ndjson', '--array'):
+        mode = args.pop(0)
+    if len(args) == 1:
+        if args[0] == "--help":
+            raise SystemExit(usage)
+        text = sys.stdin.read()
+    elif len(args) == 2:
+        with io.open(args[1], encoding='utf-8') as infile:
+            text = infile.read()
+    else:
+        raise SystemExit(usage)
+
+    path = default_socket()
+    try:
+        reply = request(args[0], text, mode, path)
+    except socket.error as e:
+        raise SystemExit("cannot reach the validation daemon at %s: %s" % (path, e))
+
+    for error in reply['errors']:
+        if error['label'] is not None:
+            sys.stderr.write("%s %d: %s\n" % (error['label'], error['number'],
+                                              error['message']))
+    if reply['exit'] is not None:
+        raise SystemExit(reply['exit'])
+
+if __name__ == '__main__':
+    main()
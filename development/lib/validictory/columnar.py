@@ -0,0 +1,282 @@
+import sys
+
+from validictory.validator import COLUMNS_MIN_ITEMS, SchemaValidator, _str_type
+
+if sys.version_info[0] == 3:
+    _int_types = (int,)
+    _string_types = frozenset([str])
+else:
+    _int_types = (int, long)
+    _string_types = frozenset([str, unicode])
+
+# arrays shorter than this are simply validated item by item
+MIN_ITEMS = COLUMNS_MIN_ITEMS
+
+# numeric columns shorter than this aren't worth converting for numpy
+NUMPY_MIN_ITEMS = 256
+
+# integers up to this magnitude convert to floats exactly
+_EXACT_FLOAT = 2 ** 53
+
+_MISSING = object()
+
+# numpy, imported for the first numeric column long enough to use it (False
+# until then, None when it isn't installed)
+_numpy = False
+
+# exact python types accepted by each primitive json type
+_TYPES = {
+    'string': _string_types,
+    'integer': frozenset(_int_types),
+    'number': frozenset(_int_types + (float,)),
+    'boolean': frozenset([bool]),
+    'null': frozenset([type(None)]),
+}
+
+_ITEM_KEYWORDS = frozenset(['type', 'properties', 'required', 'blank',
+                            'title', 'description'])
+_PROPERTY_KEYWORDS = frozenset(['type', 'required', 'blank', 'minimum',
+                                'maximum', 'exclusiveMinimum',
+                                'exclusiveMaximum', 'divisibleBy', 'enum',
+                                'minLength', 'maxLength', 'title',
+                                'description'])
+
+# validator methods whose behaviour the columns reproduce
+_REPRODUCED = ['validate_' + keyword for keyword in _PROPERTY_KEYWORDS] + [
+    'validate_properties', 'validate_type_string', 'validate_type_integer',
+    'validate_type_number', 'validate_type_boolean', 'validate_type_null',
+    'validate_type_any', 'validate_type_object', '_type_matches']
+
+
+def _function(cls, name):
+    method = getattr(cls, name, None)
+    return getattr(method, '__func__', method)
+
+
+def _is_number(value):
+    return type(value) in (int, float) and abs(value) <= _EXACT_FLOAT
+
+
+def prepare(schema):
+    '''
+    Returns a :class:`ColumnarItems` checking arrays of items against the
+    compiled ``schema``, or None if the schema isn't an object schema made
+    only of primitive properties with checks the columns know about.
+    '''
+    validator_cls = type(schema.validator)
+    for name in _REPRODUCED:
+        if _function(validator_cls, name) is not _function(SchemaValidator, name):
+            return None
+
+    if not _ITEM_KEYWORDS.issuperset(schema) or schema.get('type', 'object') != 'object':
+        return None
+    properties = schema.get('properties', {})
+    if not isinstance(properties, dict):
+        return None
+
+    columns = []
+    for name, subschema in properties.items():
+        if name == '*' or not isinstance(subschema, dict):
+            return None
+        column = _Column.prepare(name, subschema)
+        if column is None:
+            return None
+        columns.append(column)
+    return ColumnarItems(columns)
+
+
+class ColumnarItems(object):
+    '''
+    Checks a homogeneous array of objects one property (column) at a time
+    instead of one item at a time.
+
+    The checks only screen the items: every item that isn't reported by
+    :meth:`suspects` is known to be valid, and the reported ones are
+    validated normally so that errors are exactly the same as before.
+    '''
+
+    min_items = MIN_ITEMS
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def suspects(self, items):
+        '''
+        Returns the sorted indices of the items that may not be valid.
+        '''
+        rows = [item if isinstance(item, dict) else None for item in items]
+        suspects = set(index for index, row in enumerate(rows) if row is None)
+        for column in self.columns:
+            suspects.update(column.suspects(rows))
+        return sorted(suspects)
+
+
+class _Column(object):
+
+    def __init__(self, name, subschema):
+        self.name = name
+        self.required = bool(subschema.get('required'))
+        self.blank = bool(subschema.get('blank'))
+        self.types = None
+        self.minimum = subschema.get('minimum')
+        self.maximum = subschema.get('maximum')
+        self.exclusive_minimum = bool(subschema.get('exclusiveMinimum', False))
+        self.exclusive_maximum = bool(subschema.get('exclusiveMaximum', False))
+        self.divisible_by = subschema.get('divisibleBy')
+        self.enum = subschema.get('enum')
+        self.enum_set = None
+        self.min_length = subschema.get('minLength')
+        self.max_length = subschema.get('maxLength')
+
+    @classmethod
+    def prepare(cls, name, subschema):
+        if not _PROPERTY_KEYWORDS.issuperset(subschema):
+            return None
+        column = cls(name, subschema)
+
+        fieldtype = subschema.get('type')
+        if fieldtype:
+            if not isinstance(fieldtype, (list, tuple)):
+                fieldtype = [fieldtype]
+            if 'any' not in fieldtype:
+                types = set()
+                for eachtype in fieldtype:
+                    if not isinstance(eachtype, _str_type) or eachtype not in _TYPES:
+                        return None
+                    types.update(_TYPES[eachtype])
+                types.add(type(_MISSING))
+                column.types = frozenset(types)
+
+        for bound in ('minimum', 'maximum'):
+            if bound in subschema and not _is_number(subschema[bound]):
+                return None
+        if 'divisibleBy' in subschema:
+            if not _is_number(column.divisible_by) or not column.divisible_by:
+                return None
+        if 'enum' in subschema:
+            if not isinstance(column.enum, (list, tuple)):
+                return None
+            try:
+                column.enum_set = frozenset(column.enum)
+            except TypeError:
+                pass
+        for length in ('minLength', 'maxLength'):
+            if length in subschema and type(subschema[length]) not in _int_types:
+                return None
+        for text in ('title', 'description'):
+            if not isinstance(subschema.get(text), (_str_type, type(None))):
+                return None
+        return column
+
+    def suspects(self, rows):
+        name = self.name
+        col = [_MISSING if row is None else row.get(name, _MISSING) for row in rows]
+        bad = []
+
+        if self.required:
+            bad.extend([i for i, v in enumerate(col) if v is _MISSING])
+        if self.types is not None:
+            types = self.types
+            bad.extend([i for i, v in enumerate(col) if type(v) not in types])
+        if not self.blank:
+            bad.extend([i for i, v in enumerate(col)
+                        if isinstance(v, _str_type) and not v])
+        if (self.minimum is not None or self.maximum is not None or
+                self.divisible_by is not None):
+            bad.extend(self._numeric_suspects(col))
+        if self.enum is not None:
+            bad.extend(self._enum_suspects(col))
+        if self.min_length is not None:
+            length = self.min_length
+            bad.extend([i for i, v in enumerate(col)
+                        if isinstance(v, (_str_type, list, tuple)) and len(v) < length])
+        if self.max_length is not None:
+            length = self.max_length
+            bad.extend([i for i, v in enumerate(col)
+                        if isinstance(v, (_str_type, list, tuple)) and len(v) > length])
+        return bad
+
+    def _numeric_suspects(self, col):
+        # the range checks only apply to int and float values, except that
+        # an exclusive bound is also compared against any other value
+        bad = []
+        exclusive = self.exclusive_minimum or self.exclusive_maximum
+        if exclusive or self.divisible_by is not None:
+            bad.extend([i for i, v in enumerate(col)
+                        if v is not None and v is not _MISSING and
+                        type(v) not in (int, float)])
+
+        numbers = [(i, v) for i, v in enumerate(col) if type(v) in (int, float)]
+        if len(numbers) >= NUMPY_MIN_ITEMS:
+            flagged = self._numpy_suspects(numbers)
+            if flagged is not None:
+                bad.extend(flagged)
+                return bad
+
+        minimum, maximum, divisible_by = self.minimum, self.maximum, self.divisible_by
+        if minimum is not None:
+            if self.exclusive_minimum:
+                bad.extend([i for i, v in numbers if v <= minimum])
+            else:
+                bad.extend([i for i, v in numbers if v < minimum])
+        if maximum is not None:
+            if self.exclusive_maximum:
+                bad.extend([i for i, v in numbers if v >= maximum])
+            else:
+                bad.extend([i for i, v in numbers if v > maximum])
+        if divisible_by is not None:
+            bad.extend([i for i, v in numbers if v % divisible_by != 0])
+        return bad
+
+    def _numpy_suspects(self, numbers):
+        global _numpy
+        if _numpy is False:
+            try:
+                import numpy
+            except ImportError:
+                numpy = None
+            _numpy = numpy
+        numpy = _numpy
+        if numpy is None:
+            return None
+        values = numpy.array([v for _, v in numbers])
+        # only use numpy when it compares exactly like python would
+        if values.dtype.kind not in 'if':
+            return None
+        if not (values.max() <= _EXACT_FLOAT and values.min() >= -_EXACT_FLOAT):
+            return None
+
+        mask = numpy.zeros(len(values), dtype=bool)
+        if self.minimum is not None:
+            if self.exclusive_minimum:
+                mask |= values <= self.minimum
+            else:
+                mask |= values < self.minimum
+        if self.maximum is not None:
+            if self.exclusive_maximum:
+                mask |= values >= self.maximum
+            else:
+                mask |= values > self.maximum
+        if self.divisible_by is not None:
+            with numpy.errstate(invalid='ignore'):
+                mask |= numpy.mod(values, self.divisible_by) != 0
+        indices = numpy.array([i for i, _ in numbers])
+        return indices[mask].tolist()
+
+    def _enum_suspects(self, col):
+        options, option_set = self.enum, self.enum_set
+        bad = []
+        for i, v in enumerate(col):
+            if v is None or v is _MISSING:
+                continue
+            if option_set is not None:
+                try:
+                    if v in option_set:
+                        continue
+                except TypeError:
+                    pass
+            if v not in options:
+                bad.append(i)
+        return bad
+
+__all__ = ['ColumnarItems', 'prepare']
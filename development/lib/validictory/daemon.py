@@ -0,0 +1,166 @@
+'''
+Validation daemon keeping schemas loaded and compiled between invocations,
+for build steps validating a document at a time.
+
+    python -m validictory.daemon [SOCKET]
+
+listens on a Unix domain socket (:func:`validictory.client.default_socket`
+unless given) and answers the requests of :mod:`validictory.client`. A
+schema file is read and compiled the first time it is used, and again
+whenever its modification time, size or inode change.
+
+Each request is a json object sent on its own connection, the client
+shutting down its side of the connection once sent::
+
+    {"schema": "/abs/path/schema.json", "mode": null, "input": "..."}
+
+where ``mode`` is null, ``"--ndjson"`` or ``"--array"`` as for
+``python -m validictory``, and the reply is the json object returned by
+:func:`validictory.client.request`.
+'''
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from validictory.validator import SchemaValidator, ValidationError
+from validictory.client import default_socket
+from validictory.__main__ import load_schema, check
+
+
+class SchemaStore(object):
+    '''
+    Compiled schemas by file and mode, reloaded when their file changes.
+    All of them are compiled by the same validator, so that the subschemas
+    they have in common are shared.
+    '''
+
+    def __init__(self, validator=None):
+        if validator is None:
+            validator = SchemaValidator()
+        self.validator = validator
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, schemafile, mode=None):
+        stat = os.stat(schemafile)
+        version = (stat.st_mtime, stat.st_size, stat.st_ino)
+        key = (schemafile, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        compiled = self.validator.compile(load_schema(schemafile, mode))
+        with self._lock:
+            self._entries[key] = (version, compiled)
+        return compiled
+
+
+def _describe(error, label=None, number=None):
+    return {'label': label, 'number': number, 'path': list(error.path),
+            'keyword': error.keyword, 'message': str(error)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.read().decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError("the request is not a json object")
+            reply = self.server.answer(request)
+        except Exception as e:
+            # a malformed request or a failure of the daemon still gets a
+            # reply, the client is waiting for one
+            reply = {'errors': [], 'exit': "%s: %s" % (e.__class__.__name__, e)}
+        self.wfile.write(json.dumps(reply).encode('utf-8'))
+
+
+class ValidationServer(socketserver.ThreadingUnixStreamServer):
+    '''
+    Unix domain socket server answering validation requests.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, path, schemas=None):
+        socketserver.ThreadingUnixStreamServer.__init__(self, path, _Handler)
+        if schemas is None:
+            schemas = SchemaStore()
+        self.schemas = schemas
+
+    def answer(self, request):
+        '''
+        Returns the reply to a request, running the command line
+        validator's checks on the input.
+        '''
+        mode = request.get('mode')
+        errors = []
+
+        def report(label, number, error):
+            errors.append(_describe(error, label, number))
+
+        exit = None
+        try:
+            compiled = self.schemas.get(request['schema'], mode)
+            failures = check(compiled, io.StringIO(request['input']), mode, report)
+            if failures:
+                exit = "%d invalid records" % failures
+        except ValidationError as e:
+            errors.append(_describe(e))
+            exit = str(e)
+        except (ValueError, EnvironmentError) as e:
+            exit = str(e)
+        return {'errors': errors, 'exit': exit}
+
+
+def serve(path=None, schemas=None):
+    '''
+    Runs a :class:`ValidationServer` on ``path`` until interrupted.
+    '''
+    if path is None:
+        path = default_socket()
+    if os.path.exists(path):
+        # only take over the socket of a daemon that is gone
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except socket.error:
+            os.unlink(path)
+        else:
+            raise SystemExit("a daemon is already listening on %s" % path)
+        finally:
+            probe.close()
+
+    server = ValidationServer(path, schemas)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    if len(argv) > 2 or argv[1:] == ['--help']:
+        raise SystemExit("%s [SOCKET]" % argv[0])
+    # stop (and remove the socket) on kill too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    serve(argv[1] if len(argv) == 2 else None)
+
+__all__ = ['SchemaStore', 'ValidationServer', 'serve']
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import marshal
+
+from validictory.validator import (FIELD_WILDCARD, CompiledSchema, _run_entries)
+
+# the changes of a value that is checked again as a whole: one of another
+# type, one that isn't an object or array, or an object whose keys changed
+# order
+_REPLACED = object()
+
+
+class IncrementalResult(object):
+    '''
+    Outcome of :meth:`SchemaValidator.validate_incremental`: the document
+    that was validated, its errors, and where in the document they were
+    found, which lets a later version of the document be validated by only
+    rechecking what changed.
+
+    The document must not be modified in place afterwards, revalidate a
+    new version of it instead.
+    '''
+
+    def __init__(self, schema, data, errors, tree):
+        self.schema = schema
+        self.data = data
+        self.errors = errors
+        self._tree = tree
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def revalidate(self, data, changed=None):
+        '''
+        Validates a new version of the document, rechecking only the parts
+        that differ from this one, see :func:`validate_incremental`.
+        '''
+        return validate_incremental(self.schema.validator, data, self.schema, self, changed)
+
+
+def validate_incremental(validator, data, schema, previous=None, changed=None):
+    '''
+    Validates ``data`` collecting every error like
+    :meth:`SchemaValidator.iter_errors`. When an :class:`IncrementalResult`
+    for an earlier version of the document is given, only the fields whose
+    value differs between the two versions are checked again, along with the
+    keywords (like ``dependencies``) that look at the other fields of the
+    object holding a field.
+
+    The two versions are compared once, in a single pass over them, unless
+    ``changed`` gives the paths (tuples of property names and list indices
+    like :attr:`ErrorRecord.path`) of the values that were changed, added
+    or removed since, which only costs as much as the paths are long. A
+    value removed from or added to an array, other than at its end, moves
+    the ones after it, give the path of the array then.
+    '''
+    if previous is not None and (schema is previous.schema or
+                                 schema is previous.schema.schema):
+        schema = previous.schema
+    else:
+        schema = validator._compiled(schema)
+
+    errors = []
+    if previous is not None and previous.schema is schema:
+        if changed is None:
+            changes = _diff(previous.data, data)
+        else:
+            changes = _changes(changed)
+        if changes is not None:
+            changes = {"config": changes}
+        top = _Descent(validator, errors, changes, previous.errors, previous._tree, 0)
+    else:
+        top = _Descent(validator, errors, _REPLACED, (), {}, 0)
+    for error in _run_entries(top._visit("config", "config", {"config": data}, schema, "", ())):
+        errors.append(error)
+    return IncrementalResult(schema, data, errors, top.children)
+
+
+def _equal(old, new):
+    try:
+        return old == new
+    except RuntimeError:
+        # nested too deep to compare (RecursionError is a RuntimeError)
+        return False
+
+
+def _strict(old, new):
+    # whether values that compare equal also have the same types and key
+    # order, which == doesn't tell (1 == True, objects in any order) but
+    # validation does
+    try:
+        return marshal.dumps(old, marshal.version) == marshal.dumps(new, marshal.version)
+    except ValueError:
+        # nested too deep, or not only json values
+        return False
+
+
+def _diff(old, new):
+    # the changes between two versions of a value: None when they are the
+    # same, _REPLACED, or for an object or array a dictionary of the changes
+    # of the properties or items that differ; each value is compared once
+    if old is new or (_equal(old, new) and _strict(old, new)):
+        return None
+    root = {}
+    stack = [(old, new, root, None)]
+    while stack:
+        old, new, holder, key = stack.pop()
+        if type(old) is not type(new) or not isinstance(new, (dict, list, tuple)):
+            holder[key] = _REPLACED
+            continue
+        if isinstance(new, dict):
+            if [name for name in old if name in new] != [name for name in new if name in old]:
+                holder[key] = _REPLACED
+                continue
+            changes = dict((name, _REPLACED) for name in old if name not in new)
+            changes.update((name, _REPLACED) for name in new if name not in old)
+            pairs = [(name, old[name], new[name]) for name in new if name in old]
+        else:
+            common = min(len(old), len(new))
+            changes = dict((index, _REPLACED) for index in range(common, max(len(old), len(new))))
+            pairs = [(index, old[index], new[index]) for index in range(common)]
+        holder[key] = changes
+
+        equal = []
+        for pair in pairs:
+            if pair[1] is pair[2]:
+                continue
+            if _equal(pair[1], pair[2]):
+                equal.append(pair)
+            else:
+                stack.append((pair[1], pair[2], changes, pair[0]))
+        if equal and not _strict([pair[1] for pair in equal], [pair[2] for pair in equal]):
+            # some only compare equal, look for them one at a time
+            for pair in equal:
+                if not _strict(pair[1], pair[2]):
+                    stack.append((pair[1], pair[2], changes, pair[0]))
+    return root[None]
+
+
+def _changes(paths):
+    # the changes of _diff for the values at paths
+    changes = {}
+    for path in paths:
+        path = tuple(path)
+        if not path:
+            return _REPLACED
+        node = changes
+        for key in path[:-1]:
+            child = node.get(key)
+            if child is _REPLACED:
+                break
+            if child is None:
+                child = node[key] = {}
+            node = child
+        else:
+            node[path[-1]] = _REPLACED
+    return changes or None
+
+
+class _Descent(object):
+    # goes down into the children found by the _iter_* walkers of
+    # SchemaValidator (see validictory.multi) for a visit of a value, whose
+    # changes since the previous version are given like _diff returns them:
+    # a child that didn't change gives the errors it had in the previous
+    # version, the others are walked again with a descent of their own.
+    #
+    # The children with errors are kept in ``children``, for the next
+    # version, by (key, schema serial, wrapped) as (start, count, children)
+    # where start is the position of their first error from that of the
+    # first error of the visit, and children those of the child.
+
+    def __init__(self, validator, errors, changes, old_errors, old_children, old_start):
+        self.validator = validator
+        self.errors = errors
+        self.changes = changes
+        self.old_errors = old_errors
+        self.old_children = old_children
+        self.old_start = old_start
+        self.children = {}
+        self.start = len(errors)
+
+    def _child_entries(self, fieldname, data, schema, location, path):
+        return self._visit(path[-1], fieldname, data, schema, location, path)
+
+    def _visit(self, key, fieldname, data, schema, location, path):
+        if schema is None:
+            return
+        validator = self.validator
+        if not isinstance(schema, CompiledSchema) or schema.validator is not validator:
+            schema = validator.compile(schema)
+        name = (key, schema._serial, data is None)
+        changes = self.changes
+        if changes is not None and changes is not _REPLACED:
+            changes = changes.get(key)
+        old = self.old_children.get(name)
+
+        start = len(self.errors)
+        if fieldname == FIELD_WILDCARD:
+            # its checks look at every field of data, always checked again
+            yield validator._iter_errors(fieldname, data, schema, location, path)
+            children = {}
+        elif changes is None and (data is None or self.changes is None or
+                                  not schema.contextual):
+            if old is None:
+                return
+            first = self.old_start + old[0]
+            for error in self.old_errors[first:first + old[1]]:
+                yield error
+            children = old[2]
+        else:
+            if data is None:
+                fieldname, data = "config", {"config": fieldname}
+            if old is None:
+                descent = _Descent(validator, self.errors, changes, self.old_errors, {}, 0)
+            else:
+                descent = _Descent(validator, self.errors, changes, self.old_errors, old[2],
+                                   self.old_start + old[0])
+            yield validator._iter_checks(fieldname, data, schema, location, path, descent)
+            children = descent.children
+        if len(self.errors) > start:
+            self.children[name] = (start - self.start, len(self.errors) - start, children)
+
+    def _item_indices(self, value, items):
+        # the items that changed, and those that had errors, which are
+        # given again
+        changes = self.changes
+        if changes is _REPLACED:
+            indices = range(len(value))
+        else:
+            indices = [index for index in changes or ()
+                       if isinstance(index, int) and index < len(value)]
+        indices = self.validator._suspects(value, items, indices)
+        if changes is not _REPLACED:
+            failed = set(name[0] for name in self.old_children
+                         if name[2] and name[1] == items._serial and name[0] < len(value))
+            indices = sorted(failed.union(indices))
+        return indices, None
+
+    def _sampled_entries(self, items, length, sampled, children):
+        return ()
+
+
+__all__ = ['IncrementalResult', 'validate_incremental']
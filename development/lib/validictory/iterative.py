@@ -0,0 +1,303 @@
+'''
+Validation on an explicit stack.
+
+:func:`validate` walks the document like :meth:`SchemaValidator.validate`
+did and raises the same error, but keeps the nodes it is descending
+through on a list instead of the python stack, so documents (and schemas)
+can be nested far deeper than the recursion limit. Properties are checked
+in the object holding them, and the items of an array share one wrapper,
+instead of each value being wrapped in a dictionary of its own, and the
+dotted location of a node is only joined when an error message shows it.
+
+:meth:`SchemaValidator.validate` uses it for the schemas nested deeper than
+:data:`~validictory.validator.RECURSION_DEPTH` levels (or holding
+themselves), unless the validator overrides the methods it reproduces; a
+recursive walk is faster for the others. :mod:`validictory.aio` runs the
+same steps, yielding to the event loop between them.
+'''
+from validictory.validator import (FIELD_WILDCARD, CompiledSchema, PatternSet,
+                                   SchemaError, SchemaValidator,
+                                   UnexpectedPropertyError, ValidationError,
+                                   _LENGTH_MISMATCH, _PAUSE, _Pointer, _run_steps)
+
+# children validated without a step of their own (having no subschemas to
+# descend into) a walker goes through before yielding a _PAUSE
+PAUSE_EVERY = 100
+
+
+def validate(validator, data, schema, location="_data"):
+    '''
+    Validates a piece of json data against the provided json-schema.
+    '''
+    if _function(type(validator)._validate) is not _function(SchemaValidator._validate):
+        # reproducing it would skip the override
+        validator._validate(data, schema, location="")
+        return
+    try:
+        step = _enter(validator, "config", {"config": data}, schema, "")
+        if step is not None:
+            _run_steps(step)
+    except ValidationError as e:
+        del e._path[-1]
+        raise
+
+
+# The generators below mirror SchemaValidator._validate, __validate and the
+# validate_* methods descending into subschemas; they yield the steps they
+# would have called, which _run_steps runs for them, and a _PAUSE every
+# PAUSE_EVERY children validated in place.
+
+def _validate(validator, data, schema, location="config"):
+    try:
+        step = _enter(validator, "config", {"config": data}, schema, location)
+        if step is not None:
+            yield step
+    except ValidationError as e:
+        del e._path[-1]
+        raise
+
+
+def _enter(validator, fieldname, data, schema, location):
+    # validates a node whose checks don't descend into subschemas right
+    # away, and returns the step validating any other node
+    if schema is None:
+        return None
+    if not isinstance(schema, CompiledSchema) or schema.validator is not validator:
+        schema = validator.compile(schema)
+    plan = _plan(schema)
+    if validator.memo is not None and validator.sample is None:
+        return _remembered(validator, fieldname, data, schema, location, plan[0])
+    if plan[1]:
+        return _node(validator, fieldname, data, schema, location, plan[0])
+
+    if fieldname == FIELD_WILDCARD:
+        fieldnames = data
+    else:
+        fieldnames = (fieldname,)
+    try:
+        for fieldname in fieldnames:
+            for keyword, check, value, wants_location, walker in plan[0]:
+                if wants_location:
+                    check(data, fieldname, schema, value, location)
+                else:
+                    check(data, fieldname, schema, value)
+    except Exception as e:
+        _reraise(schema, data, fieldname, location, keyword, e)
+    return None
+
+
+def _reraise(schema, data, fieldname, location, keyword, e):
+    # the checks ran cheapest first, raise the error the schema's own
+    # order would have found first
+    failed, error = schema._reference_error(data, fieldname, str(location), keyword, e)
+    if isinstance(error, ValidationError):
+        error._descend(fieldname, failed, schema)
+    if error is e:
+        raise
+    raise error
+
+
+def _node(validator, fieldname, data, schema, location, steps):
+    if fieldname == FIELD_WILDCARD:
+        fieldnames = data
+    else:
+        fieldnames = (fieldname,)
+    try:
+        for fieldname in fieldnames:
+            for keyword, check, value, wants_location, walker in steps:
+                if walker is not None:
+                    yield walker(validator, data, fieldname, schema, value, location)
+                elif wants_location:
+                    check(data, fieldname, schema, value, location)
+                else:
+                    check(data, fieldname, schema, value)
+    except Exception as e:
+        _reraise(schema, data, fieldname, location, keyword, e)
+
+
+def _remembered(validator, fieldname, data, schema, location, steps):
+    # _node, skipped for the subtrees the validator's memo knows passed
+    memo = validator.memo
+    memo.enter()
+    try:
+        key = memo.key(schema, data, fieldname)
+        if key is not None and memo.passed(key):
+            return
+        yield _node(validator, fieldname, data, schema, location, steps)
+        if key is not None:
+            memo.add(key)
+    finally:
+        memo.leave()
+
+
+def _plan(schema):
+    # the ordered checks of a schema with the walker replacing each check
+    # descending into subschemas, and whether there is any such walker;
+    # kept until the checks are reordered
+    plan = schema._plan
+    if plan is None or plan[0] is not schema.ordered_checks:
+        steps = []
+        for keyword, check, value, wants_location in schema.ordered_checks:
+            walker = _WALKERS.get(keyword)
+            if walker is not None and _function(check) is not walker[0]:
+                # overridden or instrumented, call it instead
+                walker = None
+            if wants_location and walker is None:
+                if keyword == 'required' and _function(check) is _REQUIRED:
+                    check = _required
+                else:
+                    check = _joining(check)
+            steps.append((keyword, check, value, wants_location,
+                          walker and walker[1]))
+        descends = any(step[4] is not None for step in steps)
+        plan = schema._plan = (schema.ordered_checks, (tuple(steps), descends))
+    return plan[1]
+
+
+def _function(method):
+    return getattr(method, '__func__', method)
+
+
+def _joining(check):
+    # the checks called with the location expect a string
+    def joined(data, fieldname, schema, value, location):
+        return check(data, fieldname, schema, value, str(location))
+    return joined
+
+
+def _required(x, fieldname, schema, required, location):
+    # validate_required, which only shows the location when it fails
+    if fieldname != FIELD_WILDCARD and fieldname not in x and required:
+        schema.validator.validate_required(x, fieldname, schema, required, str(location))
+
+
+def _properties(validator, x, fieldname, schema, properties, location):
+    if fieldname == FIELD_WILDCARD:
+        validator.validate_properties(x, fieldname, schema, properties, str(location))
+        return
+    value = x.get(fieldname)
+    if value is not None and isinstance(value, dict):
+        if not isinstance(properties, dict):
+            raise SchemaError("Properties definition of field '%s' is not an object" % fieldname)
+        location = _Pointer(location, "." + fieldname)
+        inline = 0
+        for eachProp in properties:
+            step = _enter(validator, eachProp, value, properties.get(eachProp), location)
+            if step is not None:
+                yield step
+            else:
+                inline += 1
+                if inline == PAUSE_EVERY:
+                    inline = 0
+                    yield _PAUSE
+
+
+def _items(validator, x, fieldname, schema, items, location):
+    value = x.get(fieldname)
+    if value is None or not isinstance(value, (list, tuple)):
+        return
+    if isinstance(items, (list, tuple)):
+        if not 'additionalItems' in schema and len(items) != len(value):
+            validator._error(_LENGTH_MISMATCH, value, fieldname)
+        for itemIndex in range(len(items)):
+            try:
+                yield _validate(validator, value[itemIndex], items[itemIndex], "")
+            except ValidationError as e:
+                e._wrap(fieldname, itemIndex, False)
+                raise
+    elif isinstance(items, dict):
+        indices, sampled = validator._item_indices(value, items)
+        # the checks only look at the wrapper while the item is validated
+        wrapper = {}
+        inline = 0
+        for index in indices:
+            wrapper["config"] = value[index]
+            try:
+                step = _enter(validator, "config", wrapper, items, "config")
+                if step is not None:
+                    yield step
+                else:
+                    inline += 1
+                    if inline == PAUSE_EVERY:
+                        inline = 0
+                        yield _PAUSE
+            except ValidationError as e:
+                del e._path[-1]
+                e._wrap(fieldname, index, True)
+                raise
+        if sampled is not None:
+            validator.sample.record(items.path, len(value), sampled, ())
+    else:
+        raise SchemaError("Properties definition of field '%s' is not a list or an object" % fieldname)
+
+
+def _patternProperties(validator, x, fieldname, schema, patternproperties, location):
+    if patternproperties == None:
+        patternproperties = {}
+    if not isinstance(patternproperties, PatternSet):
+        patternproperties = PatternSet(patternproperties)
+
+    matched = [[] for _ in patternproperties.pairs]
+    for key, value in x.get(fieldname).items():
+        for index in patternproperties.match(key):
+            matched[index].append((key, value))
+
+    wrapper = {}
+    inline = 0
+    for (pattern, subschema), values in zip(patternproperties.pairs, matched):
+        for key, value in values:
+            wrapper["config"] = value
+            try:
+                step = _enter(validator, "config", wrapper, subschema, "")
+                if step is not None:
+                    yield step
+                else:
+                    inline += 1
+                    if inline == PAUSE_EVERY:
+                        inline = 0
+                        yield _PAUSE
+            except ValidationError as e:
+                del e._path[-1]
+                e._within(key)
+                raise
+
+
+def _additionalProperties(validator, x, fieldname, schema, additionalProperties, location):
+    if isinstance(additionalProperties, bool) and additionalProperties:
+        return
+    if not isinstance(additionalProperties, (dict, bool)):
+        raise SchemaError("additionalProperties schema definition for field '%s' is not an object" % fieldname)
+
+    value = x.get(fieldname)
+    properties = schema.get("properties")
+    if properties is None:
+        properties = {}
+    if value is None:
+        value = {}
+    inline = 0
+    for eachProperty in value:
+        if eachProperty not in properties:
+            if isinstance(additionalProperties, bool):
+                raise UnexpectedPropertyError(eachProperty)
+            step = _enter(validator, eachProperty, value, additionalProperties, "")
+            if step is not None:
+                yield step
+            else:
+                inline += 1
+                if inline == PAUSE_EVERY:
+                    inline = 0
+                    yield _PAUSE
+
+
+_REQUIRED = _function(SchemaValidator.validate_required)
+
+_WALKERS = {
+    'properties': (_function(SchemaValidator.validate_properties), _properties),
+    'items': (_function(SchemaValidator.validate_items), _items),
+    'patternProperties': (_function(SchemaValidator.validate_patternProperties),
+                          _patternProperties),
+    'additionalProperties': (_function(SchemaValidator.validate_additionalProperties),
+                             _additionalProperties),
+}
+
+__all__ = ['validate']
@@ -0,0 +1,219 @@
+'''
+Validation of one document against several schemas in a single walk.
+
+:func:`validate_multiple` collects every error of each schema like
+:meth:`SchemaValidator.iter_errors`, but visits every node of the document
+once, with all the subschemas that apply to it, instead of walking the
+document again for each schema. The subschemas identical in several schemas
+share one compiled form (see :meth:`SchemaValidator.compile`), their checks
+only run once per node and their errors are reported for each schema.
+Keeping track of the schemas costs more than it saves for a single one,
+use :meth:`SchemaValidator.iter_errors` then. The validator's ``memo``
+isn't used, its ``sample`` is.
+
+A schema can also be a fragment given with the path of the value it
+describes, as a ``(path, schema)`` pair: ``path`` is a tuple of property
+names and list indices like :attr:`ErrorRecord.path`, and the fragment is
+checked as if the schemas of the objects and arrays leading to the value
+described it through ``properties`` and ``items``, so a ``required``
+fragment reports a missing property. The paths of the errors are from the
+document root.
+'''
+import itertools
+from collections import namedtuple
+
+from validictory.validator import (FIELD_WILDCARD, CompiledSchema, ErrorRecord,
+                                   _ITERATED_KEYWORDS, _inherited, _run_entries,
+                                   _run_steps)
+
+
+class SchemaResult(namedtuple('SchemaResult', ['name', 'errors'])):
+    '''
+    Outcome of one schema of :func:`validate_multiple`: the name it was
+    given under and the list of :class:`ErrorRecord` found (empty when the
+    document is valid).
+    '''
+
+    __slots__ = ()
+
+    @property
+    def valid(self):
+        return not self.errors
+
+
+def validate_multiple(validator, data, schemas):
+    '''
+    Validates ``data`` against every schema of ``schemas``, a dictionary
+    of schemas or ``(path, schema)`` fragments by name (or a list of them,
+    named by position), and returns a dictionary of :class:`SchemaResult`
+    by name.
+    '''
+    if isinstance(schemas, dict):
+        named = list(schemas.items())
+    else:
+        named = list(enumerate(schemas))
+
+    results = {}
+    starts = []
+    tokens = itertools.count()
+    for name, schema in named:
+        path = ()
+        if isinstance(schema, (list, tuple)) and len(schema) == 2:
+            path, schema = tuple(schema[0]), schema[1]
+        schema = validator._compiled(schema)
+        results[name] = SchemaResult(name, [])
+        anchor = _anchor(data, path)
+        if anchor is not None:
+            fieldname, holder, location = anchor
+            starts.append((name, path, (next(tokens), fieldname, holder, schema, location)))
+
+    if not _inherited_walk(validator):
+        # a subclass changing how iter_errors walks the document is walked
+        # once per schema
+        for name, path, visit in starts:
+            token, fieldname, holder, schema, location = visit
+            results[name].errors.extend(_run_entries(
+                validator._iter_errors(fieldname, holder, schema, location, path)))
+        return results
+
+    pending = {}
+    for name, path, visit in starts:
+        pending.setdefault(path, []).append(visit)
+    errors = {}
+    while pending:
+        # fragments below no other schema start walks of their own
+        path = min(pending, key=len)
+        _run_steps(_walk(validator, path, pending.pop(path), pending, tokens, errors))
+    for name, path, visit in starts:
+        results[name].errors.extend(errors[visit[0]])
+    return results
+
+
+def _inherited_walk(validator):
+    names = (['_iter_errors', '_iter_checks', '_child_entries', '_sampled_entries',
+              '_item_indices'] +
+             list(_ITERATED_KEYWORDS.values()))
+    return all(_inherited(validator, name) for name in names)
+
+
+def _anchor(data, path):
+    # the field, object and location iter_errors would validate the value
+    # at path with, or None if the document has no object (or array item)
+    # holding such a value
+    fieldname, holder, location = "config", {"config": data}, ""
+    for key in path:
+        value = holder.get(fieldname)
+        if isinstance(value, dict):
+            fieldname, holder, location = key, value, location + "." + fieldname
+        elif (isinstance(value, (list, tuple)) and isinstance(key, int) and
+              not isinstance(key, bool) and 0 <= key < len(value)):
+            fieldname, holder, location = "config", {"config": value[key]}, ""
+        else:
+            return None
+    return fieldname, holder, location
+
+
+def _walk(validator, path, visits, pending, tokens, errors):
+    # validates the value at path for each visit, a (token, fieldname, data,
+    # schema, location) tuple like the arguments of _iter_errors, and sets
+    # the errors of each visit by token; a step of _run_steps, yielding the
+    # walks of the children
+    if pending and path in pending:
+        visits = visits + pending.pop(path)
+
+    children = {}
+    order = []
+    stitched = []
+    computed = {} if len(visits) > 1 else None
+    wrapper = None
+    for token, fieldname, data, schema, location in visits:
+        if data is None:
+            # an item, all the item visits of a node share their wrapper
+            if wrapper is None:
+                wrapper = {"config": fieldname}
+            fieldname, data = "config", wrapper
+        if computed is not None:
+            key = (fieldname, id(data), schema._serial, location)
+            if key in computed:
+                stitched.append((token, (computed[key],)))
+                continue
+            computed[key] = token
+        if fieldname == FIELD_WILDCARD:
+            # its checks look at every field of data, not at one node
+            errors[token] = list(_run_entries(validator._iter_errors(fieldname, data, schema,
+                                                                     location, path)))
+            continue
+        sequence = _checks(validator, fieldname, data, schema, location, path,
+                           children, order, tokens)
+        if sequence.__class__ is list:
+            errors[token] = sequence
+        else:
+            stitched.append((token, sequence))
+
+    for key in order:
+        yield _walk(validator, path + (key,), children[key], pending, tokens, errors)
+
+    for token, sequence in stitched:
+        found = []
+        for entry in sequence:
+            if entry.__class__ is int:
+                found.extend(errors[entry])
+            elif entry.__class__ is ErrorRecord:
+                found.append(entry)
+            else:
+                items, length, sampled, indices = entry
+                failed = [index for index, child in indices if errors[child]]
+                validator.sample.record(items.path, length, sampled, failed)
+        errors[token] = found
+
+
+def _checks(validator, fieldname, data, schema, location, path, children, order, tokens):
+    # runs the checks of a visit in the order iter_errors reports them and
+    # returns its list of errors, or when it has subschemas (which are
+    # added to the visits of the children) a tuple holding their tokens in
+    # place of their errors
+    descent = _Descent(validator, children, order, tokens)
+    sequence = list(_run_entries(validator._iter_checks(fieldname, data, schema, location,
+                                                        path, descent)))
+    if any(entry.__class__ is not ErrorRecord for entry in sequence):
+        return tuple(sequence)
+    return sequence
+
+
+class _Descent(object):
+    # goes down into the children found by the _iter_* walkers of
+    # SchemaValidator by adding a visit for each to the walk of its path,
+    # and giving its token in place of its errors; the items of a sampled
+    # array are recorded once their errors are known
+
+    def __init__(self, validator, children, order, tokens):
+        self.validator = validator
+        self.children = children
+        self.order = order
+        self.tokens = tokens
+        self.issued = {}
+
+    def _child_entries(self, fieldname, data, schema, location, path):
+        if schema is None:
+            return
+        validator = self.validator
+        if not isinstance(schema, CompiledSchema) or schema.validator is not validator:
+            schema = validator.compile(schema)
+        key = path[-1]
+        token = self.issued[key] = next(self.tokens)
+        if key in self.children:
+            self.children[key].append((token, fieldname, data, schema, location))
+        else:
+            self.children[key] = [(token, fieldname, data, schema, location)]
+            self.order.append(key)
+        yield token
+
+    def _item_indices(self, value, items):
+        return self.validator._item_indices(value, items)
+
+    def _sampled_entries(self, items, length, sampled, children):
+        return ((items, length, sampled,
+                 [(index, self.issued[index]) for index, count in children if count]),)
+
+
+__all__ = ['validate_multiple', 'SchemaResult']
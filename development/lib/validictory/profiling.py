@@ -0,0 +1,100 @@
+from validictory.validator import ValidationError
+
+
+class ValidationStats(object):
+    '''
+    Calls, cumulative time and failures of the checks run by a
+    :class:`SchemaValidator` created with ``stats=ValidationStats()``,
+    aggregated per keyword (``pattern``, ``items``, ...) and per schema path
+    (the JSON pointer of the keyword within the schema, e.g.
+    ``#/properties/version/pattern``).
+
+    Time spent in keywords that descend into subschemas (``properties``,
+    ``items``, ...) includes the time of the checks run below them.
+
+    Checks are only instrumented when a schema is compiled by a validator
+    that has a stats object, so validators without one don't pay anything.
+    The counters aren't updated atomically, use one stats object per thread.
+    '''
+
+    def __init__(self):
+        self.keywords = {}
+        self.paths = {}
+
+    def _entry(self, table, key):
+        entry = table.get(key)
+        if entry is None:
+            # calls, seconds, failures
+            entry = table[key] = [0, 0.0, 0]
+        return entry
+
+    def instrument(self, check, keyword, path):
+        '''
+        Returns ``check`` wrapped so that its calls are recorded under
+        ``keyword`` and ``path``.
+        '''
+        from timeit import default_timer as timer
+        by_keyword = self._entry(self.keywords, keyword)
+        by_path = self._entry(self.paths, path)
+
+        def instrumented(*args):
+            start = timer()
+            try:
+                return check(*args)
+            except ValidationError:
+                by_keyword[2] += 1
+                by_path[2] += 1
+                raise
+            finally:
+                elapsed = timer() - start
+                by_keyword[0] += 1
+                by_keyword[1] += elapsed
+                by_path[0] += 1
+                by_path[1] += elapsed
+
+        return instrumented
+
+    def reset(self):
+        '''
+        Zeroes all the counters (checks compiled earlier keep recording).
+        '''
+        for table in (self.keywords, self.paths):
+            for entry in table.values():
+                entry[:] = [0, 0.0, 0]
+
+    def as_dict(self):
+        '''
+        Returns the counters as ``{'keywords': {...}, 'paths': {...}}``,
+        each entry being a dict with ``calls``, ``time`` and ``failures``.
+        '''
+        def convert(table):
+            return dict((key, {'calls': calls, 'time': seconds, 'failures': failures})
+                        for key, (calls, seconds, failures) in table.items() if calls)
+        return {'keywords': convert(self.keywords), 'paths': convert(self.paths)}
+
+    def dump(self, fp):
+        '''
+        Writes the counters to the file ``fp`` as JSON.
+        '''
+        import json
+        json.dump(self.as_dict(), fp, indent=2, sort_keys=True)
+
+    def table(self, by='keywords', sort='time', limit=None):
+        '''
+        Returns the counters of ``by`` (``'keywords'`` or ``'paths'``) as a
+        text table sorted by ``sort`` (``'time'``, ``'calls'`` or
+        ``'failures'``), largest first.
+        '''
+        rows = sorted(self.as_dict()[by].items(),
+                      key=lambda item: item[1][sort], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+        width = max([len(by)] + [len(key) for key, _ in rows])
+        lines = ['%-*s %10s %12s %10s' % (width, by, 'calls', 'time ms', 'failures')]
+        for key, entry in rows:
+            lines.append('%-*s %10d %12.3f %10d' % (width, key, entry['calls'],
+                                                    entry['time'] * 1000,
+                                                    entry['failures']))
+        return '\n'.join(lines)
+
+__all__ = ['ValidationStats']
@@ -0,0 +1,115 @@
+import sys
+import math
+from collections import namedtuple
+
+if sys.version_info[0] == 3:
+    _range = range
+else:
+    _range = xrange
+
+
+class SampleReport(namedtuple('SampleReport', ['path', 'length', 'checked',
+                                               'failures', 'failure_bound'])):
+    '''
+    What :class:`Sampling` checked of one array: the JSON pointer of its
+    ``items`` schema, the length of the array, the number of items checked
+    and found invalid, and the upper bound on the fraction of invalid items
+    in the whole array at the sampling's confidence level.
+    '''
+
+    __slots__ = ()
+
+
+class Sampling(object):
+    '''
+    Makes a :class:`SchemaValidator` created with ``sample=Sampling()``
+    check only part of the arrays validated against an ``items`` schema
+    longer than ``size + 2 * edges``: the first and last ``edges`` items and
+    ``size`` items drawn at random in between. The draw only depends on
+    ``seed`` and the length of the array, so validating the same document
+    again checks the same items.
+
+    Every sampled array adds a :class:`SampleReport` to ``reports``. Its
+    ``failure_bound`` is computed from the random draw alone, the first and
+    last items aren't a random sample.
+
+    Setting ``full`` makes the validators using this object check every
+    item again, to promote a sampled validation to a full one without
+    changing their callers.
+
+    Like :class:`~validictory.profiling.ValidationStats` the reports aren't
+    updated atomically, use one object per thread.
+    '''
+
+    def __init__(self, size=1000, confidence=0.95, seed=0, edges=10, full=False):
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        self.size = size
+        self.confidence = confidence
+        self.seed = seed
+        self.edges = edges
+        self.full = full
+        self.reports = []
+
+    def indices(self, length):
+        '''
+        Returns the sorted positions of the items to check in an array of
+        ``length`` items, or None to check them all.
+        '''
+        edges = self.edges
+        if self.full or length <= self.size + 2 * edges:
+            return None
+        import random
+        drawn = random.Random(self.seed).sample(_range(edges, length - edges), self.size)
+        drawn.sort()
+        return list(_range(edges)) + drawn + list(_range(length - edges, length))
+
+    def record(self, path, length, checked, failed):
+        '''
+        Adds the report of an array of ``length`` items of which the
+        positions ``checked`` were checked and ``failed`` were invalid.
+        '''
+        edges = self.edges
+        drawn_failures = sum(1 for index in failed if edges <= index < length - edges)
+        report = SampleReport(path, length, len(checked), len(failed),
+                              failure_bound(self.size, drawn_failures, self.confidence))
+        self.reports.append(report)
+        return report
+
+    def reset(self):
+        del self.reports[:]
+
+
+def failure_bound(draws, failures, confidence):
+    '''
+    Returns the upper bound, at ``confidence``, on the fraction of invalid
+    items in an array when ``failures`` of ``draws`` items drawn from it at
+    random were invalid (the one-sided Clopper-Pearson bound).
+    '''
+    if failures >= draws:
+        return 1.0
+    if failures == 0:
+        return 1 - (1 - confidence) ** (1.0 / draws)
+
+    # the rate at which seeing at most ``failures`` invalid items is only
+    # 1 - confidence likely, found by bisection
+    low, high = failures / float(draws), 1.0
+    for _ in range(60):
+        rate = (low + high) / 2
+        if _binomial_cdf(failures, draws, rate) > 1 - confidence:
+            low = rate
+        else:
+            high = rate
+    return high
+
+
+def _binomial_cdf(k, n, p):
+    # probability of at most k successes in n trials of probability p
+    log_p, log_q = math.log(p), math.log(1 - p)
+    total = 0.0
+    for i in range(k + 1):
+        total += math.exp(math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) +
+                          i * log_p + (n - i) * log_q)
+    return total
+
+__all__ = ['Sampling', 'SampleReport', 'failure_bound']
@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+import validictory
+
+
+class TestValidateMany(TestCase):
+
+    schema = {'type': 'object', 'properties': {'a': {'type': 'integer'}}}
+    docs = [{'a': 1}, {'a': 'x'}, {'a': 2}, {}]
+
+    def check(self, results):
+        self.assertEqual([(result.index, result.valid) for result in results],
+                         [(0, True), (1, False), (2, True), (3, False)])
+
+    def test_schema_error_on_call(self):
+        # before the results are asked for, and before any worker starts
+        for workers in (1, 2):
+            self.assertRaises(validictory.SchemaError, validictory.validate_many,
+                              self.docs, {'type': 'foo'}, workers=workers)
+
+    def test_in_process(self):
+        self.check(validictory.validate_many(self.docs, self.schema, workers=1))
+
+    def test_workers(self):
+        self.check(validictory.validate_many(self.docs, self.schema, workers=2, chunksize=1))
@@ -0,0 +1,135 @@
+import copy
+import json
+import marshal
+import shutil
+import tempfile
+from unittest import TestCase
+
+import validictory
+from validictory import SchemaValidator
+from validictory.cache import DiskCache, FormatCache, SchemaCache, schema_digest, _deep_repr
+
+
+def _digits(validator, fieldname, value, format_option):
+    if not value.isdigit():
+        raise validictory.ValidationError("Value %r of field '%s' is not digits"
+                                          % (value, fieldname))
+
+
+def _anything(validator, fieldname, value, format_option):
+    pass
+
+
+class TestFormatCache(TestCase):
+
+    def test_hit(self):
+        cache = FormatCache()
+        validator = SchemaValidator(format_cache=cache)
+        validator.register_format_validator('digits', _digits, cache=True)
+        schema = {'type': 'array', 'items': {'type': 'string', 'format': 'digits'}}
+        validator.validate(['12', '12', '12'], schema)
+        self.assertEqual(cache.info().hits, 2)
+        self.assertEqual(cache.info().misses, 1)
+
+    def test_shared_by_validators_checking_differently(self):
+        cache = FormatCache()
+        lenient = SchemaValidator(format_cache=cache)
+        lenient.register_format_validator('code', _anything, cache=True)
+        strict = SchemaValidator(format_cache=cache)
+        strict.register_format_validator('code', _digits, cache=True)
+        schema = {'type': 'string', 'format': 'code'}
+        lenient.validate('abc', schema)
+        self.assertRaises(validictory.ValidationError, strict.validate, 'abc', schema)
+
+
+class TestSchemaCache(TestCase):
+
+    def test_equal_schemas_share_an_entry(self):
+        cache = SchemaCache()
+        schema = {'type': 'object', 'properties': {'a': {'type': 'integer'}}}
+        compiled = cache.get(schema)
+        self.assertTrue(cache.get(schema) is compiled)
+        self.assertTrue(cache.get(dict(schema)) is compiled)
+        self.assertEqual(cache.info().misses, 1)
+        self.assertEqual(cache.info().hits, 2)
+
+    def test_schema_changed_in_place(self):
+        cache = SchemaCache()
+        schema = {'type': 'integer'}
+        compiled = cache.get(schema)
+        schema['type'] = 'string'
+        self.assertFalse(cache.get(schema) is compiled)
+        self.assertRaises(validictory.ValidationError, cache.get(schema).validate, 1)
+
+    def test_key_order(self):
+        # the first key failing is reported, whichever order was cached first
+        first = json.loads('{"enum": ["x"], "maxLength": 1}')
+        second = json.loads('{"maxLength": 1, "enum": ["x"]}')
+        self.assertEqual(schema_digest(first) == schema_digest(second),
+                         list(first) == list(second))
+        for schema in (first, second, first):
+            try:
+                validictory.validate('yy', schema)
+            except validictory.ValidationError as e:
+                self.assertEqual(e.keyword, list(copy.copy(schema))[0])
+            else:
+                self.fail("no error")
+
+    def test_deep_repr(self):
+        values = [{}, [], (), (1,), (1, 'a'), [{'a': [1, 2.5, None]}, True, u'\u00e9'],
+                  {'type': ['string', {'type': 'null'}], 'enum': [(), ([],)], 'x': {}}]
+        for value in values:
+            self.assertEqual(_deep_repr(value), repr(value))
+
+    def test_deep_schema(self):
+        schema = data = None
+        for level in range(5000):
+            schema = {'type': 'object', 'properties': {'child': schema or {'type': 'integer'}}}
+            data = {'child': data if data is not None else level}
+        validictory.validate(data, schema)
+        data['child'] = 'x'
+        self.assertRaises(validictory.ValidationError, validictory.validate, data, schema)
+
+
+class TestDiskCache(TestCase):
+
+    schema = {'type': 'object', 'properties': {'a': {'type': 'integer', 'maximum': 3},
+                                               'b': {'type': 'array', 'items': {'type': 'string'}}}}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.source = json.dumps(self.schema).encode('utf-8')
+
+    def stored(self, **options):
+        cache = DiskCache(self.directory, SchemaValidator(**options))
+        cache.put(self.source, cache.validator.compile(self.schema))
+        return cache
+
+    def test_round_trip(self):
+        self.stored()
+        cache = DiskCache(self.directory)
+        compiled = cache.get(self.source)
+        self.assertEqual(compiled.schema, self.schema)
+        compiled.validate({'a': 1, 'b': ['x']})
+        self.assertRaises(validictory.ValidationError, compiled.validate, {'a': 4, 'b': ['x']})
+        self.assertRaises(validictory.ValidationError, compiled.validate, {'a': 1, 'b': [1]})
+
+    def test_stale_entries(self):
+        cache = self.stored()
+        self.assertEqual(cache.get(self.source.replace(b'3', b'4')), None)
+        self.assertEqual(cache.get(self.source, '--array'), None)
+        self.assertEqual(DiskCache(self.directory, SchemaValidator(required_by_default=False))
+                         .get(self.source), None)
+
+        # from another version, in the file of this one
+        header = cache._header(None)
+        with open(cache._filename(self.source, header), 'rb') as f:
+            entry = marshal.loads(f.read())
+        with open(cache._filename(self.source, header), 'wb') as f:
+            f.write(marshal.dumps(((header[0], '0.1') + header[2:],) + entry[1:]))
+        self.assertEqual(cache.get(self.source), None)
+
+        with open(cache._filename(self.source, header), 'wb') as f:
+            f.write(b'not marshal')
+        self.assertEqual(cache.get(self.source), None)
@@ -0,0 +1,91 @@
+from unittest import TestCase
+
+import validictory
+from validictory import SchemaValidator
+
+
+ICONS = {'type': 'object',
+         'properties': {'icons': {'type': 'object', 'required': False,
+                                  'patternProperties': {'^[0-9]+$': {}}}}}
+CLOSED = {'type': 'object',
+          'properties': {'a': {'type': 'object', 'additionalProperties': False}}}
+
+
+def _keywords(errors):
+    return [(error.path, error.keyword) for error in errors]
+
+
+class TestNotAnObject(TestCase):
+    '''
+    patternProperties and additionalProperties on a field that isn't an
+    object, once its type was reported.
+    '''
+
+    def check(self, schema, data, expected):
+        validator = SchemaValidator()
+        self.assertEqual(_keywords(validator.iter_errors(data, schema)), expected)
+        self.assertEqual(_keywords(validator.validate_incremental(data, schema).errors),
+                         expected)
+        results = validator.validate_multiple(data, {'one': schema, 'two': schema})
+        self.assertEqual(_keywords(results['one'].errors), expected)
+        self.assertEqual(_keywords(results['two'].errors), expected)
+        result, = validictory.validate_many([data], schema, workers=1)
+        self.assertEqual(_keywords(result.errors), expected)
+
+    def test_patternProperties(self):
+        self.check(ICONS, {'icons': 'x'}, [(('icons',), 'type')])
+
+    def test_additionalProperties(self):
+        self.check(CLOSED, {'a': 'xy'}, [(('a',), 'type')])
+
+    def test_without_type(self):
+        # reports what validate finds
+        schema = {'type': 'object',
+                  'properties': {'a': {'additionalProperties': False}}}
+        self.assertRaises(validictory.ValidationError,
+                          validictory.validate, {'a': 'xy'}, schema)
+        self.check(schema, {'a': 'xy'}, [(('a',), 'additionalProperties')])
+
+
+
+class TestDeep(TestCase):
+    '''
+    Documents nested deeper than the python stack.
+    '''
+
+    def setUp(self):
+        self.schema = {'type': 'integer'}
+        for level in range(3000):
+            self.schema = {'type': 'object', 'properties': {'child': self.schema}}
+        self.data = self.nested('x')
+        self.expected = [(('child',) * 3000, 'type')]
+
+    def nested(self, leaf):
+        data = leaf
+        for level in range(3000):
+            data = {'child': data}
+        return data
+
+    def test_iter_errors(self):
+        validator = SchemaValidator()
+        self.assertEqual(_keywords(validator.iter_errors(self.data, self.schema)),
+                         self.expected)
+        self.assertEqual(_keywords(validator.iter_errors(self.data, self.schema, 1)),
+                         self.expected)
+
+    def test_validate_multiple(self):
+        results = SchemaValidator().validate_multiple(self.data, [self.schema, self.schema])
+        self.assertEqual(_keywords(results[0].errors), self.expected)
+        self.assertEqual(_keywords(results[1].errors), self.expected)
+
+    def test_validate_many(self):
+        result, = validictory.validate_many([self.data], self.schema, workers=1)
+        self.assertEqual(_keywords(result.errors), self.expected)
+
+    def test_validate_incremental(self):
+        result = SchemaValidator().validate_incremental(self.data, self.schema)
+        self.assertEqual(_keywords(result.errors), self.expected)
+        result = result.revalidate(self.nested(1))
+        self.assertEqual(result.errors, [])
+        result = result.revalidate(self.data, changed=[('child',) * 3000])
+        self.assertEqual(_keywords(result.errors), self.expected)
@@ -0,0 +1,64 @@
+import os
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from unittest import TestCase
+
+from validictory.client import request
+from validictory.daemon import ValidationServer
+
+
+class TestDaemon(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.schemafile = os.path.join(self.directory, 'schema.json')
+        with open(self.schemafile, 'w') as f:
+            json.dump({'type': 'object', 'properties': {'a': {'type': 'integer'}}}, f)
+        self.path = os.path.join(self.directory, 'daemon.sock')
+        self.server = ValidationServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def send(self, message):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            sock.sendall(message)
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            sock.close()
+        return json.loads(b''.join(chunks).decode('utf-8'))
+
+    def test_valid(self):
+        self.assertEqual(request(self.schemafile, '{"a": 1}', path=self.path),
+                         {'errors': [], 'exit': None})
+
+    def test_invalid(self):
+        reply = request(self.schemafile, '{"a": "x"}', path=self.path)
+        self.assertEqual([error['path'] for error in reply['errors']], [['a']])
+        self.assertTrue(reply['exit'])
+
+    def test_malformed_requests(self):
+        for message in (b'{"schema": ', b'[1]', b'\xff',
+                        json.dumps({'schema': self.schemafile}).encode('utf-8'),
+                        json.dumps({'schema': None, 'input': '{}'}).encode('utf-8')):
+            reply = self.send(message)
+            self.assertEqual(reply['errors'], [])
+            self.assertTrue(reply['exit'])
+        # still answering
+        self.assertEqual(request(self.schemafile, '{"a": 1}', path=self.path)['exit'], None)
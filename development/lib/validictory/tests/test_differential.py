@@ -0,0 +1,236 @@
+'''
+Differential tests: the engines and caches that are meant to give the same
+answers as the plain recursive validator are run against it on random
+schemas and documents.
+'''
+import copy
+import random
+from unittest import TestCase
+
+from validictory import SchemaValidator, SubtreeMemo
+from validictory import iterative
+
+_VALUES = {
+    'type': ['string', 'integer', 'number', 'array', 'object', ['string', 'null'],
+             {'type': 'string'}],
+    'enum': [[1, 2, 'a'], ['ab', 'abc'], [[1], {'a': 1}]],
+    'minLength': [0, 1, 2, 3], 'maxLength': [0, 1, 2, 3],
+    'minimum': [-2, 0, 2], 'maximum': [-2, 0, 2],
+    'pattern': ['^a', 'b$', '[0-9]'],
+    'format': ['date', 'time', 'date-time'],
+    'uniqueItems': [True],
+    'required': [True, False], 'blank': [True, False],
+    'disallow': ['string', 'integer', 'null'],
+    'dependencies': ['x', ['x', 'y']],
+    'divisibleBy': [2, 3],
+}
+_LEAVES = ['', 'a', 'ab', 'b', '12:00:00', '2012-01-01', 0, 1, 3, -3, 2.5, None,
+           True, [1, 1]]
+
+
+class _Random(random.Random):
+    '''
+    Random schemas and documents, small enough that their errors often
+    interact.
+    '''
+
+    def schema(self, depth=0):
+        schema = dict((keyword, self.choice(_VALUES[keyword]))
+                      for keyword in self.sample(sorted(_VALUES), self.randint(0, 5)))
+        if depth < 2:
+            if self.random() < .4:
+                schema['properties'] = dict((name, self.schema(depth + 1))
+                                            for name in self.sample('xyz', 2))
+            if self.random() < .3:
+                schema['items'] = self.schema(depth + 1)
+            if self.random() < .2:
+                schema['additionalProperties'] = self.choice([False, self.schema(depth + 1)])
+            if self.random() < .1:
+                schema['patternProperties'] = {'^[xy]': self.schema(depth + 1),
+                                               'z|w': self.schema(depth + 1)}
+        return schema
+
+    def datum(self, depth=0):
+        draw = self.random()
+        if depth < 2 and draw < .25:
+            return dict((name, self.datum(depth + 1))
+                        for name in self.sample('xyzw', self.randint(0, 3)))
+        if depth < 2 and draw < .4:
+            return [self.datum(depth + 1) for _ in range(self.randint(0, 3))]
+        # a copy, mutate changes lists in place
+        return copy.deepcopy(self.choice(_LEAVES))
+
+    def mutate(self, data):
+        # changes, adds or removes one value somewhere in data, and returns
+        # the path of what changed (None for nothing)
+        node = data
+        path = ()
+        while True:
+            if isinstance(node, dict) and node:
+                key = self.choice(sorted(node))
+            elif isinstance(node, list) and node:
+                key = self.randrange(len(node))
+            else:
+                return None
+            if isinstance(node[key], (dict, list)) and self.random() < .6:
+                node = node[key]
+                path += (key,)
+                continue
+            draw = self.random()
+            if draw < .3:
+                del node[key]
+                if isinstance(node, list):
+                    # the items after it moved
+                    return path
+            elif draw < .7 or isinstance(node, list):
+                node[key] = self.datum(1)
+            else:
+                key = self.choice('xyzw')
+                node[key] = self.datum(1)
+            return path + (key,)
+
+
+def _outcome(call, *args):
+    try:
+        call(*args)
+    except Exception as e:
+        return (type(e).__name__, str(e), getattr(e, 'path', None),
+                getattr(e, 'keyword', None))
+    return None
+
+
+def _errors(validator, data, schema):
+    try:
+        return [(e.path, e.keyword, e.message) for e in validator.iter_errors(data, schema)]
+    except Exception as e:
+        return type(e).__name__
+
+
+class TestEngines(TestCase):
+
+    def test_iterative(self):
+        rnd = _Random(21)
+        for _ in range(2000):
+            validator = SchemaValidator()
+            try:
+                schema = validator.compile(rnd.schema())
+            except Exception:
+                continue
+            data = rnd.datum()
+            self.assertEqual(_outcome(iterative.validate, validator, data, schema),
+                             _outcome(validator.validate, data, schema))
+
+    def test_incremental(self):
+        rnd = _Random(9)
+        for _ in range(300):
+            validator = SchemaValidator()
+            schema = rnd.schema()
+            data = {'x': rnd.datum(), 'y': [rnd.datum(), rnd.datum()], 'z': rnd.datum()}
+            try:
+                result = validator.validate_incremental(data, schema)
+            except Exception:
+                continue
+            for _ in range(10):
+                data = copy.deepcopy(data)
+                changed = [rnd.mutate(data) for _ in range(rnd.choice([1, 1, 2, 4]))]
+                if rnd.random() < .5:
+                    changed = None
+                else:
+                    changed = [path for path in changed if path is not None]
+                expected = _errors(validator, data, schema)
+                try:
+                    result = validator.validate_incremental(data, schema, result, changed)
+                except Exception as e:
+                    self.assertEqual(type(e).__name__, expected)
+                    break
+                self.assertEqual([(e.path, e.keyword, e.message) for e in result.errors],
+                                 expected)
+
+    def test_multiple(self):
+        rnd = _Random(23)
+        for _ in range(1500):
+            schemas = dict(('s%d' % index, rnd.schema()) for index in range(rnd.randint(1, 4)))
+            if rnd.random() < .5:
+                schemas['copy'] = copy.deepcopy(schemas['s0'])
+            key, fragment = rnd.choice('xyzw'), rnd.schema(1)
+            schemas['fragment'] = ((key,), fragment)
+            data = rnd.datum()
+
+            expected = {}
+            for name, schema in schemas.items():
+                if name != 'fragment':
+                    expected[name] = _errors(SchemaValidator(), data, schema)
+                elif isinstance(data, dict):
+                    expected[name] = _errors(SchemaValidator(), data,
+                                             {'properties': {key: fragment}})
+                else:
+                    # no object holds the value it describes
+                    expected[name] = []
+            try:
+                results = SchemaValidator().validate_multiple(data, schemas)
+            except Exception:
+                self.assertTrue(any(not isinstance(errors, list)
+                                    for errors in expected.values()))
+                continue
+            self.assertEqual(dict((name, [(e.path, e.keyword, e.message) for e in result.errors])
+                                  for name, result in results.items()),
+                             expected)
+
+
+class TestCaches(TestCase):
+
+    def test_memo(self):
+        # a memo shared by validate and iter_errors, filled by documents
+        # repeating the same subtrees
+        rnd = _Random(20)
+        for _ in range(300):
+            schema = rnd.schema()
+            memoized = SchemaValidator(memo=SubtreeMemo(maxsize=rnd.choice([2, 50, 1000])))
+            plain = SchemaValidator()
+            pool = [rnd.datum() for _ in range(4)]
+            for _ in range(10):
+                if rnd.random() < .5:
+                    data = rnd.choice(pool)
+                else:
+                    data = {'x': rnd.choice(pool), 'y': [rnd.choice(pool), rnd.choice(pool)],
+                            'z': rnd.choice(pool)}
+                self.assertEqual(_outcome(memoized.validate, data, schema),
+                                 _outcome(plain.validate, data, schema))
+                self.assertEqual(_errors(memoized, data, schema), _errors(plain, data, schema))
+
+    def test_columnar(self):
+        class Plain(SchemaValidator):
+            # columns only check arrays for validators with the stock checks
+            def validate_properties(self, *args):
+                return SchemaValidator.validate_properties(self, *args)
+
+        item = {'type': 'object', 'properties': {
+            'id': {'type': 'integer', 'minimum': 0, 'maximum': 10 ** 6},
+            'price': {'type': 'number', 'minimum': 0, 'exclusiveMinimum': True,
+                      'divisibleBy': 0.5},
+            'name': {'type': 'string', 'maxLength': 8, 'minLength': 1},
+            'kind': {'type': 'string', 'enum': ['a', 'b', 'c'], 'required': False},
+            'flag': {'type': ['boolean', 'null'], 'required': False}}}
+        schema = {'type': 'array', 'items': item}
+        changes = [('id', -1), ('price', 0), ('price', 0.3), ('name', ''), ('name', 'x' * 9),
+                   ('kind', 'z'), ('id', None), ('flag', 1), ('id', True), ('id', 2 ** 60),
+                   ('kind', None), ('kind', [1]), ('id', 3.0)]
+        rnd = _Random(7)
+        for _ in range(100):
+            length = rnd.choice([5, 40, 300])
+            data = [{'id': i, 'price': (i % 50 + 1) / 2.0, 'name': 'n%d' % (i % 1000),
+                     'kind': 'abc'[i % 3], 'flag': [True, None][i % 2]}
+                    for i in range(length)]
+            for _ in range(rnd.choice([0, 1, 3])):
+                field, value = rnd.choice(changes)
+                row = data[rnd.randrange(length)]
+                if value is None:
+                    row.pop(field, None)
+                else:
+                    row[field] = value
+            if rnd.random() < .1:
+                data[rnd.randrange(length)] = 'not an object'
+            self.assertEqual(_outcome(SchemaValidator().validate, data, schema),
+                             _outcome(Plain().validate, data, schema))
+            self.assertEqual(_errors(SchemaValidator(), data, schema),
+                             _errors(Plain(), data, schema))
@@ -0,0 +1,43 @@
+import io
+import json
+from unittest import TestCase
+
+from validictory.__main__ import iter_array
+
+
+class TestIterArray(TestCase):
+
+    items = [1, -2.5e3, "a,]b", {"x": [1, 2, {"y": None}]}, [], True, 120, u"\u00e9"]
+
+    def parse(self, text, read_size):
+        return [item for _, item in iter_array(io.StringIO(text), read_size)]
+
+    def test_read_sizes(self):
+        text = u' [ ' + u' ,\n'.join(json.dumps(item) for item in self.items) + u' ] '
+        for read_size in (1, 2, 3, 7, 64, 4096):
+            self.assertEqual(self.parse(text, read_size), self.items)
+
+    def test_empty(self):
+        self.assertEqual(self.parse(u'[ ]', 1), [])
+
+    def test_positions(self):
+        text = u'[' + u','.join(str(i) for i in range(1000)) + u']'
+        self.assertEqual(list(iter_array(io.StringIO(text), 100)),
+                         [(i, i) for i in range(1000)])
+
+    def test_long_item(self):
+        class Counting(io.StringIO):
+            reads = 0
+
+            def read(self, size=-1):
+                Counting.reads += 1
+                return io.StringIO.read(self, size)
+
+        item = [u'x' * 10] * 20000
+        text = u'[' + json.dumps(item) + u', 1]'
+        self.assertEqual([value for _, value in iter_array(Counting(text), 64)], [item, 1])
+        self.assertTrue(Counting.reads < 30)
+
+    def test_errors(self):
+        for text in (u'{}', u'[1 2]', u'[1,', u'[{]'):
+            self.assertRaises(ValueError, self.parse, text, 2)
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import validictory
+from validictory.validator import PatternSet
+
+
+class TestPatternSet(TestCase):
+
+    def test_merged(self):
+        patterns = PatternSet({'^a': 1, 'a.$': 2, '^c': 3})
+        self.assertNotEqual(patterns.combined, None)
+        matched = [patterns.pairs[index][1] for index in patterns.match('ab')]
+        self.assertEqual(sorted(matched), [1, 2])
+        self.assertEqual(patterns.match('x'), [])
+
+    def test_backreference_not_merged(self):
+        patterns = PatternSet({'^(a)\\1$': 1, '^b': 2})
+        self.assertEqual(patterns.combined, None)
+        self.assertEqual(len(patterns.match('aa')), 1)
+
+    def test_inline_flags_not_merged(self):
+        patterns = PatternSet({'(?i)^a': 1, '^B': 2})
+        self.assertEqual(patterns.combined, None)
+        self.assertEqual(patterns.match('b'), [])
+
+    def test_inline_flags_apply_to_own_pattern(self):
+        schema = {'type': 'object',
+                  'patternProperties': {'(?i)^a': {'type': 'string'},
+                                        '^B': {'type': 'integer'}}}
+        validictory.validate({'b': 'x', 'A': 'y'}, schema)
+        self.assertRaises(validictory.ValidationError,
+                          validictory.validate, {'B': 'x'}, schema)
+        self.assertRaises(validictory.ValidationError,
+                          validictory.validate, {'a': 1}, schema)
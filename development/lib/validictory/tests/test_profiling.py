@@ -0,0 +1,109 @@
+import io
+import json
+from unittest import TestCase
+
+from validictory import SchemaValidator, ValidationError, ValidationStats
+
+
+SCHEMA = {'type': 'object',
+          'properties': {'a': {'type': 'integer', 'maximum': 3},
+                         'b': {'type': 'string', 'pattern': '^x', 'required': False}}}
+DOCS = [{'a': 1, 'b': 'x'}, {'a': 5, 'b': 'x'}, {'a': 1, 'b': 'y'}, {'a': 2}]
+
+
+def _profiled(schema=SCHEMA, docs=DOCS):
+    stats = ValidationStats()
+    compiled = SchemaValidator(stats=stats).compile(schema)
+    for doc in docs:
+        try:
+            compiled.validate(doc)
+        except ValidationError:
+            pass
+    return stats, compiled
+
+
+class TestValidationStats(TestCase):
+
+    def counters(self, table):
+        return dict((key, (entry['calls'], entry['failures'])) for key, entry in table.items())
+
+    def test_counters(self):
+        stats, _ = _profiled()
+        counted = stats.as_dict()
+        keywords = self.counters(counted['keywords'])
+        self.assertEqual(keywords['maximum'], (4, 1))
+        self.assertEqual(keywords['pattern'], (3, 1))
+        self.assertEqual(keywords['properties'], (4, 2))
+        paths = self.counters(counted['paths'])
+        self.assertEqual(paths['#/properties/a/maximum'], (4, 1))
+        self.assertEqual(paths['#/properties/b/type'], (3, 0))
+        self.assertEqual(paths['#/type'], (4, 0))
+        for table in counted.values():
+            for entry in table.values():
+                self.assertTrue(entry['time'] >= 0)
+
+    def test_not_compiled_with_stats(self):
+        stats, _ = _profiled()
+        SchemaValidator().compile(SCHEMA).validate(DOCS[0])
+        self.assertEqual(self.counters(stats.as_dict()['keywords'])['maximum'], (4, 1))
+
+    def test_reset(self):
+        stats, compiled = _profiled()
+        stats.reset()
+        self.assertEqual(stats.as_dict(), {'keywords': {}, 'paths': {}})
+        compiled.validate(DOCS[0])
+        self.assertEqual(self.counters(stats.as_dict()['keywords'])['maximum'], (1, 0))
+
+    def test_table(self):
+        stats, _ = _profiled()
+        lines = stats.table('paths', sort='failures', limit=3).splitlines()
+        self.assertEqual(lines[0].split(), ['paths', 'calls', 'time', 'ms', 'failures'])
+        self.assertEqual(lines[1].split()[0], '#/properties')
+        self.assertEqual(sorted(line.split()[0] for line in lines[2:]),
+                         ['#/properties/a/maximum', '#/properties/b/pattern'])
+        self.assertEqual(lines[1].split()[1], '4')
+        self.assertEqual(lines[1].split()[-1], '2')
+        lines = stats.table(sort='calls').splitlines()
+        self.assertEqual(len(lines), 1 + len(stats.as_dict()['keywords']))
+        calls = [int(line.split()[1]) for line in lines[1:]]
+        self.assertEqual(calls, sorted(calls, reverse=True))
+
+    def test_dump(self):
+        stats, _ = _profiled()
+        fp = io.StringIO() if str is not bytes else io.BytesIO()
+        stats.dump(fp)
+        self.assertEqual(json.loads(fp.getvalue()), stats.as_dict())
+
+
+class TestAdapt(TestCase):
+
+    def error(self, compiled, doc):
+        try:
+            compiled.validate(doc)
+        except ValidationError as e:
+            return str(e)
+
+    def test_failing_checks_first(self):
+        stats, compiled = _profiled(docs=[{'a': 5}] * 3 + [{'a': 1, 'b': 'y'}])
+        checks = compiled['properties']['a']
+        order = checks.checks
+        self.assertNotEqual(checks.ordered_checks[0][0], 'maximum')
+        compiled.adapt()
+        self.assertEqual(checks.ordered_checks[0][0], 'maximum')
+        self.assertEqual(compiled['properties']['b'].ordered_checks[0][0], 'pattern')
+        # in the schema's order still
+        self.assertEqual(checks.checks, order)
+
+    def test_same_errors(self):
+        docs = [{'a': 5.5}, {'a': 5}, {'a': '1'}, {'a': 1, 'b': 2}, {'a': 1, 'b': 'y'}, {}]
+        expected = [self.error(SchemaValidator().compile(SCHEMA), doc) for doc in docs]
+        stats, compiled = _profiled(docs=[{'a': 5}, {'a': 1, 'b': 'y'}])
+        compiled.adapt()
+        self.assertEqual([self.error(compiled, doc) for doc in docs], expected)
+
+    def test_given_stats(self):
+        stats, _ = _profiled(docs=[{'a': 5}])
+        compiled = SchemaValidator().compile(SCHEMA)
+        self.assertRaises(ValueError, compiled.adapt)
+        compiled.adapt(stats)
+        self.assertEqual(compiled['properties']['a'].ordered_checks[0][0], 'maximum')
@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from validictory import SchemaValidator
+from validictory.sampling import Sampling
+
+
+class TestSampledPath(TestCase):
+
+    def test_path_of_items(self):
+        schema = {'type': 'object',
+                  'properties': {'a': {'type': 'integer'},
+                                 'b': {'type': 'array', 'items': {'type': 'integer'}}}}
+        data = {'a': 1, 'b': list(range(100))}
+        for method in ('validate', 'iter_errors', 'validate_multiple'):
+            validator = SchemaValidator(sample=Sampling(size=10, edges=2))
+            if method == 'validate_multiple':
+                validator.validate_multiple(data, [schema])
+            else:
+                list(getattr(validator, method)(data, schema) or ())
+            self.assertEqual([report.path for report in validator.sample.reports],
+                             ['#/properties/b/items'])
@@ -0,0 +1,275 @@
+import copy
+import json
+import sys
+from unittest import TestCase, skipIf
+
+from validictory import SchemaValidator, ValidationStats
+from validictory.validator import SchemaError, ValidationError
+
+
+class TestCompiledOrder(TestCase):
+
+    def test_first_error_in_schema_order(self):
+        # the checks run in the order of a copy of the schema, as they
+        # always did; on python 2 a dictionary built key by key can iterate
+        # in another order
+        schema = json.loads('{"title": "T", "pattern": "^$", "enum": ["abc", 0.5, "b"], '
+                            '"disallow": "object", "additionalProperties": false, '
+                            '"type": "object"}')
+        failing = [keyword for keyword in copy.copy(schema)
+                   if keyword in ('enum', 'disallow', 'additionalProperties')]
+        try:
+            SchemaValidator().validate({"a": 1}, schema)
+        except ValidationError as e:
+            self.assertEqual(e.keyword, failing[0])
+        else:
+            self.fail("no error")
+
+    def test_properties_in_schema_order(self):
+        names = ['p%d' % index for index in range(50)]
+        schema = json.loads('{"type": "object", "properties": {%s}}' % ', '.join(
+            '"%s": {"type": "integer"}' % name for name in names))
+        data = dict((name, 'x') for name in names)
+        errors = list(SchemaValidator().iter_errors(data, schema))
+        self.assertEqual([error.path for error in errors],
+                         [(name,) for name in schema['properties']])
+
+
+class TestSchemaSources(TestCase):
+
+    def test_schema_changed_in_place(self):
+        validator = SchemaValidator()
+        schema = {'type': 'integer'}
+        validator.validate(1, schema)
+        schema['type'] = 'string'
+        self.assertRaises(ValidationError, validator.validate, 1, schema)
+        self.assertEqual([error.keyword for error in validator.iter_errors(1, schema)],
+                         ['type'])
+
+    def test_compiled_when_asked(self):
+        compiled = []
+
+        class Counting(SchemaValidator):
+            def compile(self, schema):
+                compiled.append(schema)
+                return SchemaValidator.compile(self, schema)
+
+        validator = Counting()
+        schema = {'type': 'object', 'properties': {'a': {'type': 'integer'}}}
+        validator.validate({'a': 1}, schema)
+        self.assertEqual(compiled, [])
+        prepared = validator.compile(schema)
+        validator.validate({'a': 2}, prepared)
+        list(validator.iter_errors({'a': 'x'}, prepared))
+        validator.validate_multiple({'a': 1}, [prepared])
+        self.assertEqual(len(compiled), 1)
+
+    def test_deep_schema(self):
+        # read as it is until the python stack runs out, then compiled
+        schema = data = None
+        for level in range(3000):
+            schema = {'type': 'object', 'properties': {'child': schema or {'type': 'integer'}}}
+            data = {'child': data if data is not None else level}
+        validator = SchemaValidator()
+        validator.validate(data, schema)
+        leaf = data
+        while isinstance(leaf['child'], dict):
+            leaf = leaf['child']
+        leaf['child'] = 'x'
+        try:
+            validator.validate(data, schema)
+        except ValidationError as e:
+            self.assertEqual(e.path, ('child',) * 3000)
+        else:
+            self.fail("no error")
+
+    def test_shared_between_threads(self):
+        import threading
+        validator = SchemaValidator()
+        schemas = [{'type': 'object', 'properties': {'a%d' % index: {'type': 'integer'}}}
+                   for index in range(40)]
+        failures = []
+
+        def work(offset):
+            try:
+                for index in range(400):
+                    schema = schemas[(index * 7 + offset) % 40]
+                    validator.validate(dict((name, 1) for name in schema['properties']), schema)
+            except Exception as e:
+                failures.append(e)
+
+        threads = [threading.Thread(target=work, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+
+
+class TestSchemaChecks(TestCase):
+
+    def test_invalid_schemas(self):
+        validator = SchemaValidator()
+        for schema in ({'type': 'foo'}, {'type': ['string', ['foo']]},
+                       {'properties': {'a': {'disallow': 'foo'}}},
+                       {'divisibleBy': 0}, {'properties': []},
+                       {'patternProperties': 1}, {'additionalProperties': 1},
+                       {'items': 'string'}):
+            # when compiling, even if no data reaches the keyword
+            self.assertRaises(SchemaError, validator.compile, schema)
+
+    def test_valid_schemas(self):
+        validator = SchemaValidator()
+        for schema in ({'type': ['string', {'type': 'integer'}]}, {'type': []},
+                       {'patternProperties': None}, {'additionalProperties': True},
+                       {'items': [{}]}, {'divisibleBy': 2}):
+            validator.compile(schema)
+
+    def test_divisible_by(self):
+        validator = SchemaValidator()
+        schema = validator.compile({'divisibleBy': 3})
+        validator.validate(9, schema)
+        validator.validate('a', schema)
+        self.assertRaises(ValidationError, validator.validate, 10, schema)
+
+
+class TestUniqueItems(TestCase):
+
+    def duplicates(self, data):
+        try:
+            SchemaValidator().validate(data, {'uniqueItems': True})
+        except ValidationError as e:
+            return e.params['first'], e.params['index']
+
+    def test_message(self):
+        try:
+            SchemaValidator().validate(['a', 'b', 'c', 'b'], {'uniqueItems': True})
+        except ValidationError as e:
+            self.assertEqual(str(e), "Value 'b' for field 'config' is not unique: "
+                                     "items 1 and 3 are equal")
+        else:
+            self.fail('not raised')
+
+    def test_indices(self):
+        self.assertEqual(self.duplicates([1, 2, 3]), None)
+        self.assertEqual(self.duplicates([1, 2, 1, 2]), (0, 2))
+        self.assertEqual(self.duplicates([{'a': 1}, {'a': 2}]), None)
+        self.assertEqual(self.duplicates([{'a': 1, 'b': [1]}, [1], {'b': [1], 'a': 1}]), (0, 2))
+        self.assertEqual(self.duplicates([[1, [2]], [3], [1, [2]]]), (0, 2))
+        # values that can't be hashed are compared one by one
+        self.assertEqual(self.duplicates([{'a': set([1])}, {'a': set([2])}]), None)
+        self.assertEqual(self.duplicates([{'a': set([1])}, 'x', {'a': set([1])}]), (0, 2))
+
+
+class TestInterning(TestCase):
+
+    def leaf(self, maximum):
+        return {'type': 'object', 'properties': {'x': {'maximum': maximum}}}
+
+    def test_identical_subschemas(self):
+        validator = SchemaValidator()
+        compiled = validator.compile({'properties': {'a': self.leaf(1), 'b': self.leaf(1),
+                                                     'c': self.leaf(1.0)}})
+        properties = compiled['properties']
+        self.assertTrue(properties['a'] is properties['b'])
+        # 1.0 is reported differently
+        self.assertFalse(properties['a'] is properties['c'])
+        self.assertFalse(properties['a']['properties']['x'] is properties['c']['properties']['x'])
+
+        # in other schemas of the validator too
+        self.assertTrue(validator.compile({'items': self.leaf(1)})['items'] is properties['a'])
+        self.assertFalse(SchemaValidator().compile(self.leaf(1)) is properties['a'])
+
+        data = {'a': {'x': 1}, 'b': {'x': 2}, 'c': {'x': 2}}
+        self.assertEqual(sorted((error.path, error.keyword)
+                                for error in validator.iter_errors(data, compiled)),
+                         [(('b', 'x'), 'maximum'), (('c', 'x'), 'maximum')])
+
+    def test_profiled(self):
+        # tells the schemas apart by their path
+        properties = SchemaValidator(stats=ValidationStats()).compile(
+            {'properties': {'a': self.leaf(1), 'b': self.leaf(1)}})['properties']
+        self.assertFalse(properties['a'] is properties['b'])
+
+
+class TestColumns(TestCase):
+
+    def test_short_arrays(self):
+        # don't prepare (and import) the columns
+        validator = SchemaValidator()
+        schema = validator.compile({'items': {'type': 'object',
+                                              'properties': {'a': {'type': 'integer'}}}})
+        validator.validate([{'a': 1}] * 5, schema)
+        list(validator.iter_errors([{'a': 1}] * 5, schema))
+        self.assertTrue(schema['items']._columns is False)
+        validator.validate([{'a': 1}] * 50, schema)
+        self.assertTrue(schema['items']._columns is not None)
+
+
+class TestValidationError(TestCase):
+
+    def error(self, data, schema):
+        try:
+            SchemaValidator().validate(data, schema)
+        except ValidationError as e:
+            return e
+        self.fail("no error")
+
+    def test_args(self):
+        for data, schema in [('abc', {'maxLength': 2}),
+                             ([1, 'x'], {'items': {'type': 'integer'}}),
+                             ({'a': 1, 'b': 2}, {'additionalProperties': False,
+                                                 'properties': {'a': {}}})]:
+            e = self.error(data, schema)
+            self.assertEqual(e.args, (str(e),))
+        self.assertEqual(ValidationError('message').args, ('message',))
+
+    def test_args_set(self):
+        e = self.error('abc', {'maxLength': 2})
+        e.args = ('replaced',)
+        self.assertEqual(str(e), 'replaced')
+
+    def test_pickle(self):
+        import pickle
+        e = self.error([1, 'x'], {'items': {'type': 'integer'}})
+        copied = pickle.loads(pickle.dumps(e))
+        self.assertEqual(copied.args, e.args)
+        self.assertEqual(str(copied), str(e))
+        self.assertEqual(copied.path, e.path)
+
+
+@skipIf(sys.version_info < (3, 5), "validate_async needs Python 3.5 or later")
+class TestAsync(TestCase):
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_deep_document(self):
+        schema = data = None
+        for level in range(3000):
+            schema = {'type': 'object', 'properties': {'child': schema or {'type': 'integer'}}}
+            data = {'child': data if data is not None else 'x'}
+        try:
+            self.loop.run_until_complete(SchemaValidator().validate_async(data, schema))
+        except ValidationError as e:
+            self.assertEqual(e.path, ('child',) * 3000)
+        else:
+            self.fail("no error")
+
+    def test_yields_within_an_object(self):
+        schema = {'type': 'object', 'additionalProperties': {'type': 'integer'}}
+        data = dict(('k%d' % index, index) for index in range(5000))
+        turns = []
+
+        def turn():
+            turns.append(None)
+            self.loop.call_soon(turn)
+
+        self.loop.call_soon(turn)
+        self.loop.run_until_complete(SchemaValidator().validate_async(data, schema, every=100))
+        self.assertTrue(len(turns) > 10)
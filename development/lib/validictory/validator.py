@@ -1,15 +1,21 @@
 import re
 import sys
-import copy
-from datetime import datetime
-import warnings
-from collections import Mapping, Container
-import json
+import itertools
+import weakref
+try:
+    from collections.abc import Mapping, Container
+except ImportError:
+    from collections import Mapping, Container
 
 if sys.version_info[0] == 3:
     _str_type = str
+    _int_types = (int,)
+    _scalar_types = frozenset([str, int, bool, type(None)])
 else:
     _str_type = basestring
+    _int_types = (int, long)
+    _scalar_types = frozenset([str, unicode, int, long, bool, type(None)])
+_number_types = _int_types + (float,)
 
 # if given in properties in a schema, will be used to match against any non-explicit properties found
 FIELD_WILDCARD = "*"
@@ -20,25 +26,499 @@ class SchemaError(ValueError):
     """
 
 
+# longest repr of an offending value put in an error message
+REPR_LIMIT = 200
+
+# container elements shown in an error message before eliding the rest
+_REPR_ITEMS = 20
+
+
+def _bounded_repr(value, depth=0):
+    # like repr, but only looks at the first elements of large containers,
+    # and not below REPR_LIMIT levels (each level starts with a bracket, so
+    # nothing deeper shows in the shortened text)
+    if depth >= REPR_LIMIT and type(value) in (list, tuple, dict):
+        return '...'
+    depth += 1
+    if type(value) in (list, tuple):
+        parts = [_bounded_repr(item, depth) for item in value[:_REPR_ITEMS]]
+        if len(value) > _REPR_ITEMS:
+            parts.append('...')
+        if type(value) is list:
+            return '[%s]' % ', '.join(parts)
+        if len(value) == 1:
+            return '(%s,)' % parts[0]
+        return '(%s)' % ', '.join(parts)
+    if type(value) is dict:
+        parts = ['%s: %s' % (_bounded_repr(key, depth), _bounded_repr(item, depth))
+                 for key, item in itertools.islice(value.items(), _REPR_ITEMS)]
+        if len(value) > _REPR_ITEMS:
+            parts.append('...')
+        return '{%s}' % ', '.join(parts)
+    return repr(value)
+
+
+class _ShortRepr(object):
+    # stands in for a value when formatting a message with %r
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        text = _bounded_repr(self.value)
+        if len(text) > REPR_LIMIT:
+            text = text[:REPR_LIMIT - 3] + '...'
+        return text
+
+
+# arrays of fewer items than this are validated item by item, see
+# validictory.columnar
+COLUMNS_MIN_ITEMS = 32
+
+_LENGTH_MISMATCH = "Length of list %(value)r for field '%(fieldname)s' is not equal to length of schema list"
+
+
 class ValidationError(ValueError):
     """
     validation errors encountered during validation (subclass of
     :class:`ValueError`)
+
+    Besides the message the error describes where it happened:
+
+    * ``fieldname``: name of the field that failed
+    * ``value``: the offending value
+    * ``keyword``: the schema attribute that failed (like ``'maxLength'``)
+    * ``schema``: the (sub)schema holding that attribute
+    * ``path``: tuple of the property names and list indices leading from
+      the document root to the field
+
+    The message is only formatted when it is read, with long values
+    shortened.
     """
 
+    def __init__(self, message=None, fieldname=None, value=None, desc=None,
+                 params=None):
+        ValueError.__init__(self, message)
+        self._message = message
+        self.desc = desc
+        self.params = params
+        self.fieldname = fieldname
+        self.value = value
+        self.keyword = None
+        self.schema = None
+        # path components and list schema wrappers, innermost first, so
+        # that every level the error goes through only appends
+        self._path = []
+        self._wrappers = []
+
+    @property
+    def path(self):
+        return tuple(reversed(self._path))
+
+    @property
+    def message(self):
+        if self.desc is not None:
+            params = dict(self.params)
+            params['value'] = _ShortRepr(params['value'])
+            message = self.desc % params
+        else:
+            message = self._message
+            if not isinstance(message, _str_type):
+                message = str(message)
+        for fieldname, item in self._wrappers:
+            if item:
+                # a bit of a hack: replace reference to config with
+                # 'list item' so error messages make sense
+                message = message.replace("field 'config'", 'list item')
+            message = "Failed to validate field '%s' list schema: %s" % (fieldname, message)
+        return message
+
+    @property
+    def args(self):
+        # the message, formatted when read
+        if self.desc is None and not self._wrappers:
+            return ValueError.args.__get__(self)
+        return (self.message,)
+
+    @args.setter
+    def args(self, args):
+        ValueError.args.__set__(self, args)
+        self._message = args[0] if args else None
+        self.desc = None
+        self._wrappers = []
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.message)
+
+    def __reduce__(self):
+        state = dict(self.__dict__)
+        # a compiled schema holds on to its validator, send its source
+        state['schema'] = getattr(self.schema, 'schema', self.schema)
+        return (type(self), self.args, state)
+
+    def _descend(self, fieldname, keyword, schema):
+        # records the field the error went through on its way up
+        if self.keyword is None:
+            self.keyword = keyword
+            self.schema = schema
+        self._path.append(fieldname)
+
+    def _within(self, component):
+        # records the property name or list index the error went through
+        self._path.append(component)
+
+    def _wrap(self, fieldname, index, item):
+        # records the list (and the index in it) the error went through
+        self._path.append(index)
+        self._wrappers.append((fieldname, item))
+
+
 class UnexpectedPropertyError(ValidationError):
     """
     unexpected property encountered during validation (subclass of
     :class:`ValidationError`)
     """
 
+    def __init__(self, message=None, fieldname=None, value=None, desc=None,
+                 params=None):
+        ValidationError.__init__(self, message, fieldname, value, desc, params)
+        if fieldname is None:
+            self.fieldname = message
+        self._path.append(self.fieldname)
+
+
+class ErrorRecord(object):
+    """
+    a validation error reported by :meth:`SchemaValidator.iter_errors`
+
+    ``path`` is a tuple of the property names and list indices leading from
+    the document root to the offending value, ``keyword`` the schema
+    attribute that failed and ``value`` the offending value itself.
+
+    ``message`` may be given as the :class:`ValidationError` raised by the
+    check, it is then only formatted when read.
+    """
+
+    __slots__ = ('path', 'keyword', 'value', '_message')
+
+    def __init__(self, path, keyword, value, message):
+        self.path = path
+        self.keyword = keyword
+        self.value = value
+        self._message = message
+
+    @property
+    def message(self):
+        message = self._message
+        if isinstance(message, ValidationError):
+            message = self._message = message.message
+        return message
+
+    def __reduce__(self):
+        return (ErrorRecord, (self.path, self.keyword, self.value, self.message))
+
+    def __repr__(self):
+        return 'ErrorRecord(%r, %r, %r)' % (self.path, self.keyword,
+                                            self.message)
+
+# patterns using backreferences can't be merged, their group numbers change,
+# nor patterns setting flags inline, which would apply to the others too
+_UNMERGEABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]')
+
+
+class PatternSet(object):
+    '''
+    The patterns of a ``patternProperties`` definition, compiled once.
+
+    When possible the patterns are also merged into a single regular
+    expression made of one optional lookahead per pattern, so that all the
+    patterns matching a key are found with a single match call instead of
+    one call per pattern.
+    '''
+
+    def __init__(self, patternproperties, compile_regex=re.compile):
+        self.pairs = list(patternproperties.items())
+        self.regexes = [compile_regex(pattern) for pattern, _ in self.pairs]
+        self.combined = None
+
+        if len(self.pairs) > 1 and not any(_UNMERGEABLE.search(pattern)
+                                           for pattern, _ in self.pairs):
+            # the marker group of each pattern comes right after its own
+            # groups
+            self.markers = []
+            groups = 0
+            for regex in self.regexes:
+                groups += regex.groups + 1
+                self.markers.append(groups)
+            try:
+                self.combined = re.compile(''.join('(?:(?=%s)())?' % pattern
+                                                   for pattern, _ in self.pairs))
+            except re.error:
+                pass
+
+    def match(self, key):
+        '''
+        Returns the indices of the patterns that match ``key``.
+        '''
+        if self.combined is None:
+            return [index for index, regex in enumerate(self.regexes)
+                    if regex.match(key)]
+
+        match = self.combined.match(key)
+        if match.lastindex is None:
+            return []
+        return [index for index, group in enumerate(match.group(*self.markers))
+                if group is not None]
+
+
+# tags telling frozen lists and dicts apart from tuples in _freeze
+_FROZEN_LIST = object()
+_FROZEN_DICT = object()
+
+
+def _freeze(value):
+    '''
+    Returns a hashable stand-in for ``value``, equal to the stand-in of
+    another value exactly when the two values are equal. Raises a TypeError
+    if something in ``value`` can't be hashed.
+    '''
+    if isinstance(value, list):
+        return (_FROZEN_LIST, tuple([_freeze(item) for item in value]))
+    elif isinstance(value, dict):
+        return (_FROZEN_DICT, frozenset([(key, _freeze(item))
+                                         for key, item in value.items()]))
+    elif isinstance(value, tuple):
+        return tuple([_freeze(item) for item in value])
+    hash(value)
+    return value
+
+
+# keywords whose outcome depends on the object holding a field and not only
+# on the field's own value
+CONTEXT_KEYWORDS = frozenset(['dependencies', 'requires'])
+
+# relative cost of the checks: type and presence checks, then length and
+# range checks, then regular expressions and formats, then the keywords
+# descending into subschemas; unknown keywords go in the middle
+_KEYWORD_COSTS = {
+    'title': 0, 'description': 0,
+    'type': 0, 'disallow': 0, 'required': 0, 'blank': 0, 'enum': 0,
+    'dependencies': 0, 'requires': 0,
+    'minLength': 1, 'maxLength': 1, 'minItems': 1, 'maxItems': 1,
+    'minimum': 1, 'maximum': 1, 'divisibleBy': 1,
+    'pattern': 2, 'format': 2, 'uniqueItems': 2,
+    'properties': 3, 'items': 3, 'patternProperties': 3,
+    'additionalProperties': 3, 'additionalItems': 3,
+}
+
+
+def _check_cost(check):
+    keyword, _, value, _ = check
+    if keyword in ('type', 'disallow') and (
+            isinstance(value, dict) or
+            isinstance(value, (list, tuple)) and
+            any(isinstance(each, dict) for each in value)):
+        # union types holding schemas validate them
+        return 3
+    return _KEYWORD_COSTS.get(keyword, 2)
+
+
+def _schema_key(value):
+    '''
+    Returns a hashable form of a value of a compiled schema, equal for
+    values that validate the same way, or raises TypeError if there is none.
+
+    Unlike ==, it tells apart 1, 1.0 and True, and the order of the keys
+    of a dictionary, since they show in which error is reported. Compiled
+    subschemas stand for themselves by their serial number.
+    '''
+    value_type = type(value)
+    if value_type in _scalar_types:
+        return (value_type, value)
+    if value_type is float:
+        # tells apart 0.0 and -0.0, which format differently
+        return (float, repr(value))
+    if isinstance(value, CompiledSchema):
+        if value._key is None:
+            # still being compiled (a recursive schema) or not shareable
+            raise TypeError("compiled schema can't be shared")
+        return (CompiledSchema, value._serial)
+    if value_type is dict or value_type is _SubschemaMap:
+        return _mapping_key(value)
+    if value_type in (list, tuple):
+        return (value_type, tuple([_schema_key(item) for item in value]))
+    raise TypeError("unhashable schema value %r" % (value,))
+
+
+def _mapping_key(mapping):
+    # _schema_key of a dictionary, in its own order (a copy could iterate
+    # in another order on python 2)
+    return (dict, tuple([(_schema_key(key), _schema_key(item))
+                         for key, item in mapping.items()]))
+
+
+class _SubschemaMap(dict):
+    '''
+    The compiled subschemas of a ``properties`` or ``patternProperties``
+    definition, iterating in the order of the definition. On python 2 a
+    dictionary built key by key may iterate in another order than the one
+    it was built from, which would change the property checked first.
+    '''
+
+    __slots__ = ('_order',)
+
+    def __init__(self, source, items):
+        dict.__init__(self, items)
+        self._order = list(source)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def keys(self):
+        return list(self._order)
+
+    def values(self):
+        return [self[key] for key in self._order]
+
+    def items(self):
+        return [(key, self[key]) for key in self._order]
+
+    iterkeys = __iter__
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+
+if sys.version_info[0] == 3:
+    def _subschema_map(source, items):
+        # dictionaries keep the order their keys were added in
+        return dict(items)
+else:
+    _subschema_map = _SubschemaMap
+
+
+# the keywords whose validator method partly or only checks the schema
+# itself, and the method checking the rest at every node
+_SCHEMA_CHECKED = {
+    'title': None,
+    'description': None,
+    'enum': '_validate_enum',
+    'dependencies': '_validate_dependencies',
+    'divisibleBy': '_validate_divisibleBy',
+}
+
+
+def _inherited(validator, name):
+    # whether the validator uses SchemaValidator's own method ``name``
+    method = getattr(type(validator), name, None)
+    return getattr(method, '__func__', method) is SchemaValidator.__dict__.get(name)
+
+
+def _escape_pointer(name):
+    return ('%s' % (name,)).replace('~', '~0').replace('/', '~1')
+
+
+class _Pointer(object):
+    # the JSON pointer of a subschema as its parent's and the part added to
+    # it, only joined when asked for: the joined pointers of deeply nested
+    # schemas add up to quadratic time and memory
+    __slots__ = ('parent', 'part')
+
+    def __init__(self, parent, part):
+        self.parent = parent
+        self.part = part
+
+    def __str__(self):
+        parts = []
+        pointer = self
+        while isinstance(pointer, _Pointer):
+            parts.append(pointer.part)
+            pointer = pointer.parent
+        parts.append(pointer)
+        parts.reverse()
+        return ''.join(parts)
+
+
+# the patterns datetime.strptime uses for these directives; it matches them
+# ignoring case and also accepts a single digit for most of them
+_STRPTIME_DIRECTIVES = {
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'd': r'(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])',
+    'H': r'(?P<H>2[0-3]|[0-1]\d|\d)',
+    'M': r'(?P<M>[0-5]\d|\d)',
+    'S': r'(?P<S>6[0-1]|[0-5]\d|\d)',
+}
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _strptime_regex(dateformat_string):
+    '''
+    Returns the regular expression datetime.strptime would match values
+    against for ``dateformat_string``, or None if the format uses a
+    directive other than %Y, %m, %d, %H, %M and %S.
+    '''
+    parts = []
+    chars = iter(dateformat_string)
+    for char in chars:
+        if char == '%':
+            directive = next(chars, None)
+            if directive not in _STRPTIME_DIRECTIVES:
+                return None
+            parts.append(_STRPTIME_DIRECTIVES[directive])
+        elif char.isspace():
+            return None
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.IGNORECASE)
+
+
+def _valid_datetime(match):
+    # the checks datetime makes on the fields the regular expression can't
+    fields = match.groupdict()
+    if 'S' in fields and int(fields['S']) > 59:
+        return False
+    if 'Y' in fields or 'd' in fields:
+        year = int(fields.get('Y', 1900))
+        month = int(fields.get('m', 1))
+        day = int(fields.get('d', 1))
+        if year < 1:
+            return False
+        if day > _DAYS_IN_MONTH[month]:
+            return (month == 2 and day == 29 and year % 4 == 0 and
+                    (year % 100 != 0 or year % 400 == 0))
+    return True
+
+
 def _generate_datetime_validator(format_option, dateformat_string):
+    regex = _strptime_regex(dateformat_string)
+
     def validate_format_datetime(validator, fieldname, value, format_option):
-        try:
-            datetime.strptime(value, dateformat_string)
-        except ValueError:
-            raise ValidationError(
-                    "Value %(value)r of field '%(fieldname)s' is not in '%(format_option)s' format" % locals())
+        if regex is not None and isinstance(value, _str_type):
+            # like strptime: the match can't be extended to the whole
+            # value by backtracking
+            match = regex.match(value)
+            if (match is not None and match.end() == len(value) and
+                    _valid_datetime(match)):
+                return
+        else:
+            from datetime import datetime
+            try:
+                datetime.strptime(value, dateformat_string)
+                return
+            except ValueError:
+                pass
+        raise ValidationError(
+                "Value %(value)r of field '%(fieldname)s' is not in '%(format_option)s' format" % locals())
 
     return validate_format_datetime
 
@@ -62,6 +542,11 @@ DEFAULT_FORMAT_VALIDATORS = {
     'utc-millisec' : validate_format_utc_millisec,
 }
 
+# format validators whose answer only depends on the value
+_CACHEABLE_FORMAT_VALIDATORS = frozenset([validate_format_date_time,
+                                          validate_format_date,
+                                          validate_format_time])
+
 
 class SchemaValidator(object):
     '''
@@ -73,27 +558,62 @@ class SchemaValidator(object):
         ``required`` schema attribute False by default.
     :param blank_by_default: defaults to False, set to True to make ``blank``
         schema attribute True by default.
+    :param stats: optional :class:`~validictory.profiling.ValidationStats`
+        recording the calls, time and failures of every check of the
+        schemas compiled by this validator
+    :param format_cache: optional :class:`~validictory.cache.FormatCache`
+        remembering the values that recently passed the built-in
+        ``date-time``, ``date`` and ``time`` formats, and the formats
+        registered with ``cache=True``
+    :param sample: optional :class:`~validictory.sampling.Sampling`
+        checking only a sample of the long arrays validated against an
+        ``items`` schema
+    :param memo: optional :class:`~validictory.cache.SubtreeMemo`
+        remembering the objects and arrays that passed a subschema, so
+        that repeated ones are only checked once (not used together with
+        ``sample``)
     '''
 
-    def __init__(self, format_validators=None, required_by_default=True, blank_by_default=False):
+    def __init__(self, format_validators=None, required_by_default=True, blank_by_default=False,
+                 stats=None, format_cache=None, sample=None, memo=None):
         if format_validators is None:
             format_validators = DEFAULT_FORMAT_VALIDATORS.copy()
 
         self._format_validators = format_validators
+        self._cached_formats = set(name for name, fun in format_validators.items()
+                                   if fun in _CACHEABLE_FORMAT_VALIDATORS)
         self.required_by_default = required_by_default
         self.blank_by_default = blank_by_default
+        self.stats = stats
+        self.format_cache = format_cache
+        self.sample = sample
+        self.memo = memo
+        # compiled schemas by content, shared by every schema this
+        # validator compiles
+        self._interned = weakref.WeakValueDictionary()
+
+    def register_format_validator(self, format_name, format_validator_fun, cache=False):
+        '''
+        Registers the function validating the values of ``format_name``.
 
-    def register_format_validator(self, format_name, format_validator_fun):
+        :param cache: whether the function only depends on the value it is
+            given, so that values which passed it can be remembered by the
+            validator's ``format_cache``
+        '''
         self._format_validators[format_name] = format_validator_fun
+        if cache:
+            self._cached_formats.add(format_name)
+        else:
+            self._cached_formats.discard(format_name)
 
     def validate_type_string(self, val):
         return isinstance(val, _str_type)
 
     def validate_type_integer(self, val):
-        return type(val) in (int, long)
+        return type(val) in _int_types
 
     def validate_type_number(self, val):
-        return type(val) in (int, long, float)
+        return type(val) in _number_types
 
     def validate_type_boolean(self, val):
         return type(val) == bool
@@ -113,8 +633,8 @@ class SchemaValidator(object):
     def _error(self, desc, value, fieldname, **params):
         params['value'] = value
         params['fieldname'] = fieldname
-        message = desc % params
-        raise ValidationError(message)
+        raise ValidationError(fieldname=fieldname, value=value, desc=desc,
+                              params=params)
 
     def validate_type(self, x, fieldname, schema, fieldtype=None):
         '''
@@ -131,34 +651,41 @@ class SchemaValidator(object):
             value = None
 
         if fieldtype and fieldexists:
-            if isinstance(fieldtype, (list, tuple)):
-                # Match if type matches any one of the types in the list
-                datavalid = False
-                for eachtype in fieldtype:
-                    try:
-                        self.validate_type(x, fieldname, eachtype, eachtype)
-                        datavalid = True
-                        break
-                    except ValidationError:
-                        pass
-                if not datavalid:
-                    self._error("Value %(value)r for field '%(fieldname)s' is not of type %(fieldtype)s",
-                                value, fieldname, fieldtype=fieldtype)
-            elif isinstance(fieldtype, dict):
+            if isinstance(fieldtype, dict):
                 try:
-                    self.__validate(fieldname, x, fieldtype)
-                except ValueError as e:
-                    raise e
-            else:
-                try:
-                    type_checker = getattr(self, 'validate_type_%s' % fieldtype)
-                except AttributeError:
-                    raise SchemaError("Field type '%s' is not supported." %
-                                      fieldtype)
-
-                if not type_checker(value):
-                    self._error("Value %(value)r for field '%(fieldname)s' is not of type %(fieldtype)s",
-                                value, fieldname, fieldtype=fieldtype)
+                    self.__validate(fieldname, x, fieldtype, "")
+                except ValidationError as e:
+                    # the field is recorded again by the caller
+                    del e._path[-1]
+                    raise
+            elif not self._type_matches(x, fieldname, fieldtype):
+                self._error("Value %(value)r for field '%(fieldname)s' is not of type %(fieldtype)s",
+                            value, fieldname, fieldtype=fieldtype)
+
+    def _type_matches(self, x, fieldname, fieldtype):
+        '''
+        Returns whether the (existing) field matches ``fieldtype``, or any
+        of the types if it is a list, without using a ValidationError to
+        report a mismatch.
+        '''
+        if isinstance(fieldtype, (list, tuple)):
+            for eachtype in fieldtype:
+                if self._type_matches(x, fieldname, eachtype):
+                    return True
+            return False
+        elif isinstance(fieldtype, dict):
+            try:
+                self.__validate(fieldname, x, fieldtype, "")
+            except ValidationError:
+                return False
+            return True
+        else:
+            try:
+                type_checker = getattr(self, 'validate_type_%s' % fieldtype)
+            except AttributeError:
+                raise SchemaError("Field type '%s' is not supported." %
+                                  fieldtype)
+            return type_checker(x[fieldname])
 
     def validate_properties(self, x, fieldname, schema, properties=None, location="config"):
         '''
@@ -175,7 +702,7 @@ class SchemaValidator(object):
                     raise SchemaError("Properties definition of field '%s' is not an object" % fieldname)
 
         if fieldname == FIELD_WILDCARD:
-            for actual_name, value in x.iteritems():
+            for actual_name, value in x.items():
                 validate_one_property(value, properties, location, actual_name)
         elif x.get(fieldname) is not None:
             value = x.get(fieldname)
@@ -191,27 +718,52 @@ class SchemaValidator(object):
             if isinstance(value, (list, tuple)):
                 if isinstance(items, (list, tuple)):
                     if not 'additionalItems' in schema and len(items) != len(value):
-                        self._error("Length of list %(value)r for field '%(fieldname)s' is not equal to length of schema list",
+                        self._error(_LENGTH_MISMATCH,
                                     value, fieldname)
                     else:
                         for itemIndex in range(len(items)):
                             try:
                                 self.validate(value[itemIndex], items[itemIndex])
-                            except ValueError as e:
-                                raise type(e)("Failed to validate field '%s' list schema: %s" % (fieldname, e))
+                            except ValidationError as e:
+                                e._wrap(fieldname, itemIndex, False)
+                                raise
                 elif isinstance(items, dict):
-                    for eachItem in value:
+                    indices, sampled = self._item_indices(value, items)
+                    for index in indices:
                         try:
-                            self._validate(eachItem, items)
-                        except ValueError as e:
-                            # a bit of a hack: replace reference to config
-                            # with 'list item' so error messages make sense
-                            old_error = str(e).replace("field 'config'",
-                                                       'list item')
-                            raise type(e)("Failed to validate field '%s' list schema: %s" % (fieldname, old_error))
+                            self._validate(value[index], items)
+                        except ValidationError as e:
+                            e._wrap(fieldname, index, True)
+                            raise
+                    if sampled is not None:
+                        self.sample.record(items.path, len(value), sampled, ())
                 else:
                     raise SchemaError("Properties definition of field '%s' is not a list or an object" % fieldname)
 
+    def _item_indices(self, value, items):
+        # positions of the items of ``value`` to validate against the
+        # ``items`` schema, and those of the sample they were taken from
+        # (None when the whole array is checked)
+        sampled = None
+        if self.sample is not None:
+            sampled = self.sample.indices(len(value))
+        indices = range(len(value)) if sampled is None else sampled
+        return self._suspects(value, items, indices), sampled
+
+    def _suspects(self, value, items, indices):
+        # the positions among ``indices`` of the items the columns of the
+        # ``items`` schema couldn't vouch for; short arrays don't look at
+        # the columns, which would import validictory.columnar
+        if len(indices) < COLUMNS_MIN_ITEMS:
+            return indices
+        columns = getattr(items, 'columns', None)
+        if columns is None or len(indices) < columns.min_items:
+            return indices
+        if len(indices) == len(value):
+            return columns.suspects(value)
+        suspects = columns.suspects([value[index] for index in indices])
+        return [indices[position] for position in suspects]
+
     def validate_required(self, x, fieldname, schema, required, location):
         '''
         Validates that the given field is present if required is True
@@ -236,13 +788,23 @@ class SchemaValidator(object):
 
         if patternproperties == None:
             patternproperties = {}
+        if not isinstance(patternproperties, PatternSet):
+            patternproperties = PatternSet(patternproperties)
 
         value_obj = x.get(fieldname)
 
-        for pattern, schema in patternproperties.items():
-            for key, value in value_obj.items():
-                if re.match(pattern, key):
+        matched = [[] for _ in patternproperties.pairs]
+        for key, value in value_obj.items():
+            for index in patternproperties.match(key):
+                matched[index].append((key, value))
+
+        for (pattern, schema), values in zip(patternproperties.pairs, matched):
+            for key, value in values:
+                try:
                     self.validate(value, schema)
+                except ValidationError as e:
+                    e._within(key)
+                    raise
 
     def validate_additionalItems(self, x, fieldname, schema, additionalItems=False):
         value = x.get(fieldname)
@@ -255,12 +817,17 @@ class SchemaValidator(object):
                 return
             elif len(value) != len(schema['items']):
                 #print locals(), value, len(value), len(schema['items'])
-                self._error("Length of list %(value)r for field '%(fieldname)s' is not equal to length of schema list",
+                self._error(_LENGTH_MISMATCH,
                              value, fieldname)
 
         remaining = value[len(schema['items']):]
         if len(remaining) > 0:
-            self._validate(remaining, {'items': additionalItems})
+            try:
+                self._validate(remaining, {'items': additionalItems})
+            except ValidationError as e:
+                # the index is within the remaining items
+                e._path[-1] += len(schema['items'])
+                raise
 
     def validate_additionalProperties(self, x, fieldname, schema,
                                       additionalProperties=None):
@@ -288,11 +855,12 @@ class SchemaValidator(object):
                         not additionalProperties):
                         raise UnexpectedPropertyError(eachProperty)
                     self.__validate(eachProperty, value,
-                                    additionalProperties)
+                                    additionalProperties, "")
         else:
             raise SchemaError("additionalProperties schema definition for field '%s' is not an object" % fieldname)
 
     def validate_requires(self, x, fieldname, schema, requires=None):
+        import warnings
         warnings.warn('The "requires" attribute has been replaced by "dependencies"', DeprecationWarning)
         if x.get(fieldname) is not None:
             if x.get(requires) is None:
@@ -305,12 +873,15 @@ class SchemaValidator(object):
             # handle cases where dependencies is a string or list of strings
             if isinstance(dependencies, _str_type):
                 dependencies = [dependencies]
-            if isinstance(dependencies, (list, tuple)):
-                for dependency in dependencies:
-                    if dependency not in x:
-                        self._error("Field '%(dependency)s' is required by field '%(fieldname)s'",
-                            None, fieldname, dependency=dependency)
-            elif isinstance(dependencies, dict):
+            elif not isinstance(dependencies, (list, tuple, dict)):
+                raise SchemaError("'dependencies' must be a string, "
+                                  "list of strings, or dict")
+            self._validate_dependencies(x, fieldname, schema, dependencies)
+
+    def _validate_dependencies(self, x, fieldname, schema, dependencies):
+        # validate_dependencies, for a list or dict of dependencies
+        if x.get(fieldname) is not None:
+            if isinstance(dependencies, dict):
                 # NOTE: the version 3 spec is really unclear on what this means
                 # based on the meta-schema I'm assuming that it should check
                 # that if a key exists, the appropriate value exists
@@ -319,8 +890,10 @@ class SchemaValidator(object):
                         self._error("Field '%(v)s' is required by field '%(k)s'",
                                     None, fieldname, k=k, v=v)
             else:
-                raise SchemaError("'dependencies' must be a string, "
-                                  "list of strings, or dict")
+                for dependency in dependencies:
+                    if dependency not in x:
+                        self._error("Field '%(dependency)s' is required by field '%(fieldname)s'",
+                            None, fieldname, dependency=dependency)
 
     def validate_minimum(self, x, fieldname, schema, minimum=None):
         '''
@@ -384,7 +957,11 @@ class SchemaValidator(object):
         format_validator = self._format_validators.get(format_option, None)
 
         if format_validator and value:
-            format_validator(self, fieldname, value, format_option)
+            if self.format_cache is not None and format_option in self._cached_formats:
+                self.format_cache.validate(format_validator, self, fieldname,
+                                           value, format_option)
+            else:
+                format_validator(self, fieldname, value, format_option)
 
         # TODO: warn about unsupported format ?
 
@@ -395,9 +972,11 @@ class SchemaValidator(object):
         '''
         value = x.get(fieldname)
         if isinstance(value, _str_type):
-            if not re.match(pattern, value):
+            if isinstance(pattern, _str_type):
+                pattern = re.compile(pattern)
+            if not pattern.match(value):
                 self._error("Value %(value)r for field '%(fieldname)s' does not match regular expression '%(pattern)s'",
-                            value, fieldname, pattern=pattern)
+                            value, fieldname, pattern=pattern.pattern)
 
     def validate_uniqueItems(self, x, fieldname, schema, uniqueItems=False):
         '''
@@ -415,34 +994,50 @@ class SchemaValidator(object):
         if not isinstance(values, (list, tuple)):
             return
 
-        hashables = set()
+        try:
+            keys = [_freeze(value) for value in values]
+        except TypeError:
+            # something in there can't be made hashable, lists and dicts are
+            # compared to each other the slow way
+            keys = None
+
+        seen = {}
         unhashables = []
 
-        for value in values:
-            if isinstance(value, (list, dict)):
-                container, add = unhashables, unhashables.append
+        for index, value in enumerate(values):
+            if keys is not None:
+                first = seen.setdefault(keys[index], index)
+            elif isinstance(value, (list, dict)):
+                first = index
+                for other_index, other in unhashables:
+                    if other is value or other == value:
+                        first = other_index
+                        break
+                else:
+                    unhashables.append((index, value))
             else:
-                container, add = hashables, hashables.add
+                first = seen.setdefault(value, index)
 
-            if value in container:
+            if first != index:
                 self._error(
-                    "Value %(value)r for field '%(fieldname)s' is not unique",
-                    value, fieldname)
-            else:
-                add(value)
+                    "Value %(value)r for field '%(fieldname)s' is not unique: items %(first)d and %(index)d are equal",
+                    value, fieldname, first=first, index=index)
 
     def validate_enum(self, x, fieldname, schema, options=None):
         '''
         Validates that the value of the field is equal to one of the
         specified option values
         '''
+        if x.get(fieldname) is not None and not isinstance(options, Container):
+            raise SchemaError("Enumeration %r for field '%s' must be a container", (options, fieldname))
+        self._validate_enum(x, fieldname, schema, options)
+
+    def _validate_enum(self, x, fieldname, schema, options):
+        # validate_enum, for options known to be a container
         value = x.get(fieldname)
-        if value is not None:
-            if not isinstance(options, Container):
-                raise SchemaError("Enumeration %r for field '%s' must be a container", (options, fieldname))
-            if value not in options:
-                self._error("Value %(value)r for field '%(fieldname)s' is not in the enumeration: %(options)r",
-                            value, fieldname, options=options)
+        if value is not None and value not in options:
+            self._error("Value %(value)r for field '%(fieldname)s' is not in the enumeration: %(options)r",
+                        value, fieldname, options=options)
 
     def validate_title(self, x, fieldname, schema, title=None):
         if not isinstance(title, (_str_type, type(None))):
@@ -467,65 +1062,901 @@ class SchemaValidator(object):
             self._error("Value %(value)r field '%(fieldname)s' is not divisible by '%(divisibleBy)s'.",
                         x.get(fieldname), fieldname, divisibleBy=divisibleBy)
 
+    def _validate_divisibleBy(self, x, fieldname, schema, divisibleBy):
+        # validate_divisibleBy, for a compiled schema whose divisibleBy
+        # isn't 0
+        value = x.get(fieldname)
+        if self.validate_type_number(value) and value % divisibleBy != 0:
+            self._error("Value %(value)r field '%(fieldname)s' is not divisible by '%(divisibleBy)s'.",
+                        value, fieldname, divisibleBy=divisibleBy)
+
     def validate_disallow(self, x, fieldname, schema, disallow=None):
         '''
         Validates that the value of the given field does not match the
         disallowed type.
         '''
-        try:
-            self.validate_type(x, fieldname, schema, disallow)
-        except ValidationError:
+        if disallow and fieldname in x and not self._type_matches(x, fieldname, disallow):
             return
         self._error("Value %(value)r of type %(disallow)s is disallowed for field '%(fieldname)s'",
                     x.get(fieldname), fieldname, disallow=disallow)
 
+    def compile(self, schema):
+        '''
+        Prepares a json-schema once so that it can be used to validate many
+        documents without being re-interpreted at every node.
+
+        Returns a :class:`CompiledSchema` that can be passed to
+        :meth:`validate` in place of the schema, or used directly through
+        its own ``validate`` method. The other methods taking a schema
+        compile a schema dictionary on every call, and :meth:`validate`
+        reads it as it is, so a compiled schema doesn't see later changes
+        to the dictionary it was compiled from.
+
+        The keywords that only concern the schema (``title``,
+        ``description``, the shape of ``enum`` and ``dependencies``, and
+        ``optional`` given with ``required``) are checked here, for every
+        subschema, and raise a :class:`SchemaError` even if no document
+        would reach them.
+        '''
+        if isinstance(schema, CompiledSchema):
+            schema = schema.schema
+        if not isinstance(schema, dict):
+            raise SchemaError("Schema structure is invalid.")
+        if 'required' in schema and 'optional' in schema:
+            raise SchemaError('cannot specify optional and required')
+        return self._compile(schema, {}, "#")
+
+    def _compiled(self, schema):
+        # the compiled form of a schema given to iter_errors and the like,
+        # compiled on each call unless it already is
+        if isinstance(schema, CompiledSchema) and schema.validator is self:
+            return schema
+        return self.compile(schema)
+
+    def _compile(self, schema, memo, path):
+        # nested schemas are compiled on an explicit stack, so that their
+        # depth isn't limited by the recursion limit
+        return _run_steps(self._compile_steps(schema, memo, path))
+
+    def _compile_steps(self, schema, memo, path):
+        # yields the steps compiling the subschemas, is sent their results
+        # and finally yields the compiled schema
+        compiled = memo.get(id(schema))
+        if compiled is not None:
+            yield compiled
+            return
+
+        self._check_schema(schema, path)
+        compiled = CompiledSchema(self, schema, path)
+        memo[id(schema)] = compiled
+        # starts from a copy, which keeps the order of the keys (and so of
+        # the checks) a copy of the schema always had
+        dict.update(compiled, schema)
+
+        for schemaprop, value in schema.items():
+            subpath = _Pointer(path, "/" + _escape_pointer(schemaprop))
+            if schemaprop in ('properties', 'patternProperties'):
+                if isinstance(value, dict):
+                    subschemas = []
+                    for k, v in value.items():
+                        subschema = self._compile_subschema(v, memo,
+                                                            _Pointer(subpath, "/" + _escape_pointer(k)))
+                        if type(subschema) is _GENERATOR:
+                            subschema = yield subschema
+                        subschemas.append((k, subschema))
+                    value = _subschema_map(value, subschemas)
+            elif schemaprop in ('items', 'type', 'disallow'):
+                if isinstance(value, (list, tuple)):
+                    subschemas = []
+                    for i, v in enumerate(value):
+                        subschema = self._compile_subschema(v, memo, _Pointer(subpath, "/%d" % i))
+                        if type(subschema) is _GENERATOR:
+                            subschema = yield subschema
+                        subschemas.append(subschema)
+                    value = type(value)(subschemas)
+                else:
+                    value = self._compile_subschema(value, memo, subpath)
+                    if type(value) is _GENERATOR:
+                        value = yield value
+            elif schemaprop in ('additionalItems', 'additionalProperties'):
+                value = self._compile_subschema(value, memo, subpath)
+                if type(value) is _GENERATOR:
+                    value = yield value
+            compiled[schemaprop] = value
+
+        # handle 'optional', replace it with 'required'
+        if 'optional' in schema:
+            import warnings
+            warnings.warn('The "optional" attribute has been replaced by "required"', DeprecationWarning)
+            compiled['required'] = not schema['optional']
+        elif 'required' not in schema:
+            compiled['required'] = self.required_by_default
+
+        if 'blank' not in schema:
+            compiled['blank'] = self.blank_by_default
+
+        # identical subschemas share one compiled form, except when
+        # profiling or sampling, which tell them apart by their path
+        if self.stats is None and self.sample is None:
+            try:
+                key = _mapping_key(compiled)
+            except TypeError:
+                pass
+            else:
+                shared = self._interned.get(key)
+                if shared is not None:
+                    memo[id(schema)] = shared
+                    yield shared
+                    return
+                compiled._key = key
+                self._interned[key] = compiled
+
+        self._prepare_checks(compiled, memo)
+        yield compiled
+
+    def _check_schema(self, schema, path):
+        # raises the SchemaError of the keywords that only concern the
+        # schema, unless the validator checks them itself; _prepare_checks
+        # leaves that part out of the checks run at every node
+        for keyword in ('title', 'description'):
+            if (keyword in schema and _inherited(self, 'validate_' + keyword) and
+                    not isinstance(schema[keyword], (_str_type, type(None)))):
+                raise SchemaError("The %s of schema '%s' must be a string" % (keyword, path))
+        if ('enum' in schema and _inherited(self, 'validate_enum') and
+                not isinstance(schema['enum'], Container)):
+            raise SchemaError("Enumeration %r of schema '%s' must be a container" %
+                              (schema['enum'], path))
+        if ('dependencies' in schema and _inherited(self, 'validate_dependencies') and
+                not isinstance(schema['dependencies'], (_str_type, list, tuple, dict))):
+            raise SchemaError("'dependencies' of schema '%s' must be a string, "
+                              "list of strings, or dict" % path)
+        if ('divisibleBy' in schema and _inherited(self, 'validate_divisibleBy') and
+                schema['divisibleBy'] == 0):
+            raise SchemaError("divisibleBy of schema '%s' can not be 0" % path)
+        for keyword in ('type', 'disallow'):
+            if (schema.get(keyword) and _inherited(self, 'validate_' + keyword) and
+                    _inherited(self, '_type_matches')):
+                self._check_type_names(schema[keyword])
+        for keyword in ('properties', 'patternProperties'):
+            if (keyword in schema and _inherited(self, 'validate_' + keyword) and
+                    not isinstance(schema[keyword], dict) and
+                    not (keyword == 'patternProperties' and schema[keyword] is None)):
+                raise SchemaError("%s definition of schema '%s' is not an object" %
+                                  (keyword, path))
+        if ('additionalProperties' in schema and
+                _inherited(self, 'validate_additionalProperties') and
+                not isinstance(schema['additionalProperties'], (dict, bool))):
+            raise SchemaError("additionalProperties definition of schema '%s' is not an object"
+                              % path)
+        if ('items' in schema and _inherited(self, 'validate_items') and
+                not isinstance(schema['items'], (list, tuple, dict))):
+            raise SchemaError("items definition of schema '%s' is not a list or an object" % path)
+
+    def _check_type_names(self, fieldtype):
+        # the types _type_matches would look up, in lists of them too
+        pending = [fieldtype]
+        while pending:
+            fieldtype = pending.pop()
+            if isinstance(fieldtype, (list, tuple)):
+                pending.extend(fieldtype)
+            elif not isinstance(fieldtype, dict) and not hasattr(self, 'validate_type_%s' % fieldtype):
+                raise SchemaError("Field type '%s' is not supported." % fieldtype)
+
+    def _prepare_checks(self, compiled, memo):
+        # looks up the validator methods to run for a compiled schema whose
+        # keys are all set
+        checks = []
+        for schemaprop in compiled:
+            validator = getattr(self, "validate_" + schemaprop, None)
+            if validator:
+                value = compiled[schemaprop]
+                if schemaprop in _SCHEMA_CHECKED and _inherited(self, "validate_" + schemaprop):
+                    # what only concerns the schema was checked when compiling
+                    name = _SCHEMA_CHECKED[schemaprop]
+                    if name is None:
+                        continue
+                    validator = getattr(self, name)
+                    if schemaprop == 'dependencies' and isinstance(value, _str_type):
+                        value = [value]
+                if schemaprop == 'pattern':
+                    value = self._compile_regex(value, memo)
+                elif schemaprop == 'patternProperties' and isinstance(value, dict):
+                    try:
+                        value = PatternSet(value, lambda pattern:
+                                           self._compile_regex(pattern, memo, True))
+                    except re.error:
+                        pass
+                if self.stats is not None:
+                    validator = self.stats.instrument(
+                        validator, schemaprop, compiled.path + "/" + _escape_pointer(schemaprop))
+                checks.append((schemaprop, validator, value,
+                               schemaprop in ("properties", "required")))
+        compiled.checks = tuple(checks)
+        compiled.contextual = any(check[0] in CONTEXT_KEYWORDS for check in checks)
+        compiled._reorder(_check_cost)
+
+    def _compile_regex(self, pattern, memo, strict=False):
+        # regular expressions are compiled once per schema and shared between
+        # identical patterns; broken ones are kept as strings (and so fail
+        # when used) unless ``strict`` is set
+        key = ('regex', pattern)
+        try:
+            return memo[key]
+        except (KeyError, TypeError):
+            pass
+        try:
+            regex = re.compile(pattern)
+        except (re.error, TypeError):
+            if strict:
+                raise re.error("invalid pattern %r" % (pattern,))
+            return pattern
+        memo[key] = regex
+        return regex
+
+    def _compile_subschema(self, schema, memo, path):
+        # anything that isn't a schema (a type name, a boolean, ...) is left
+        # as-is so that a misplaced one raises its SchemaError when (and only
+        # if) that part of the schema is actually used; returns the steps
+        # compiling the others
+        if isinstance(schema, CompiledSchema):
+            if schema.validator is self:
+                return schema
+            schema = schema.schema
+        if not isinstance(schema, dict):
+            return schema
+        if 'required' in schema and 'optional' in schema:
+            raise SchemaError('cannot specify optional and required')
+        return self._compile_steps(schema, memo, path)
+
     def validate(self, data, schema, location="_data"):
         '''
         Validates a piece of json data against the provided json-schema.
+
+        A schema dictionary is read as it is, which costs less than
+        compiling it for a single document; pass the schema returned by
+        :meth:`compile` to validate many documents against it.
         '''
+        if schema is not None and not isinstance(schema, CompiledSchema) and self._reads_schemas():
+            try:
+                self._validate(data, schema, location="")
+                return
+            except RuntimeError:
+                # nested too deep for the python stack (RecursionError is a
+                # RuntimeError), validated compiled below
+                pass
+        if schema is not None:
+            schema = self._compiled(schema)
+            if schema.depth > RECURSION_DEPTH:
+                # too deep for the python stack
+                from validictory.iterative import validate
+                validate(self, data, schema)
+                return
         self._validate(data, schema, location="")
 
+    def _reads_schemas(self):
+        # whether schema dictionaries can be validated without compiling
+        # them: profiling, sampling and the memo need compiled schemas
+        return self.stats is None and self.sample is None and self.memo is None
+
     def _validate(self, data, schema, location="config"):
-        self.__validate("config", {"config": data}, schema, location)
+        try:
+            self.__validate("config", {"config": data}, schema, location)
+        except ValidationError as e:
+            # "config" only wraps the data, it isn't part of the path
+            del e._path[-1]
+            raise
 
     def __validate(self, fieldname, data, schema, location):
 
         if schema is not None:
-            if not isinstance(schema, dict):
-                raise SchemaError("Schema structure is invalid.")
-
-            newschema = copy.copy(schema)
-
-            # handle 'optional', replace it with 'required'
-            if 'required' in schema and 'optional' in schema:
-                raise SchemaError('cannot specify optional and required')
-            elif 'optional' in schema:
-                warnings.warn('The "optional" attribute has been replaced by "required"', DeprecationWarning)
-                newschema['required'] = not schema['optional']
-            elif 'required' not in schema:
-                newschema['required'] = self.required_by_default
-
-            if 'blank' not in schema:
-                newschema['blank'] = self.blank_by_default
-
-            def validate_one_field(fieldname, data, schema, location):
-                for schemaprop in newschema:
-
-                    validatorname = "validate_" + schemaprop
-                    validator = getattr(self, validatorname, None)
-                    if (schemaprop == "properties") or (schemaprop == "required"):
-                        validator(data, fieldname, schema,
-                                newschema.get(schemaprop), location)
-                    elif validator:
-                        validator(data, fieldname, schema,
-                                newschema.get(schemaprop))
-
-            if fieldname == FIELD_WILDCARD:
-                for fieldname in data:
-                    validate_one_field(fieldname, data, schema, location)
-            else:
-                validate_one_field(fieldname, data, schema, location)
+            if not isinstance(schema, CompiledSchema) or schema.validator is not self:
+                if not isinstance(schema, CompiledSchema) and self._reads_schemas():
+                    self.__read(fieldname, data, schema, location)
+                    return data
+                schema = self.compile(schema)
+
+            memo = self.memo
+            if memo is None or self.sample is not None:
+                self.__check(fieldname, data, schema, location)
+                return data
+
+            memo.enter()
+            try:
+                key = memo.key(schema, data, fieldname)
+                if key is not None and memo.passed(key):
+                    return data
+                self.__check(fieldname, data, schema, location)
+                if key is not None:
+                    memo.add(key)
+            finally:
+                memo.leave()
 
         return data
 
-__all__ = ['SchemaValidator']
+    def __read(self, fieldname, data, schema, location):
+        # __check for a schema dictionary, whose keywords are looked up
+        # and run in its order at every node
+        if not isinstance(schema, dict):
+            raise SchemaError("Schema structure is invalid.")
+
+        newschema = schema.copy()
+
+        # handle 'optional', replace it with 'required'
+        if 'required' in schema and 'optional' in schema:
+            raise SchemaError('cannot specify optional and required')
+        elif 'optional' in schema:
+            import warnings
+            warnings.warn('The "optional" attribute has been replaced by "required"', DeprecationWarning)
+            newschema['required'] = not schema['optional']
+        elif 'required' not in schema:
+            newschema['required'] = self.required_by_default
+
+        if 'blank' not in schema:
+            newschema['blank'] = self.blank_by_default
+
+        if fieldname == FIELD_WILDCARD:
+            fieldnames = data
+        else:
+            fieldnames = (fieldname,)
+
+        for fieldname in fieldnames:
+            for schemaprop in newschema:
+                validator = getattr(self, "validate_" + schemaprop, None)
+                if not validator:
+                    continue
+                try:
+                    if schemaprop == "properties" or schemaprop == "required":
+                        validator(data, fieldname, schema, newschema[schemaprop], location)
+                    else:
+                        validator(data, fieldname, schema, newschema[schemaprop])
+                except ValidationError as e:
+                    e._descend(fieldname, schemaprop, schema)
+                    raise
+
+    def __check(self, fieldname, data, schema, location):
+        checks = schema.ordered_checks
+        if fieldname == FIELD_WILDCARD:
+            fieldnames = data
+        else:
+            fieldnames = (fieldname,)
+
+        try:
+            for fieldname in fieldnames:
+                for keyword, validator, value, wants_location in checks:
+                    if wants_location:
+                        validator(data, fieldname, schema, value, location)
+                    else:
+                        validator(data, fieldname, schema, value)
+        except Exception as e:
+            # the checks ran cheapest first, report the error the
+            # schema's own order would have found first
+            failed, error = schema._reference_error(data, fieldname, location,
+                                                    keyword, e)
+            if isinstance(error, ValidationError):
+                error._descend(fieldname, failed, schema)
+            if error is e:
+                raise
+            raise error
+
+    def iter_errors(self, data, schema, max_errors=None):
+        '''
+        Validates a piece of json data against the provided json-schema,
+        lazily yielding an :class:`ErrorRecord` for every problem found
+        instead of raising a :class:`ValidationError` for the first one.
+
+        :param max_errors: optional number of errors after which to stop
+            looking at the document
+        '''
+        if schema is not None:
+            schema = self._compiled(schema)
+        errors = _run_entries(self._iter_errors("config", {"config": data}, schema, "", ()))
+        if max_errors is not None:
+            errors = itertools.islice(errors, max_errors)
+        return errors
+
+    def validate_incremental(self, data, schema, previous=None, changed=None):
+        '''
+        Validates a piece of json data against the provided json-schema,
+        collecting every error like :meth:`iter_errors`, and returns an
+        :class:`~validictory.incremental.IncrementalResult`.
+
+        :param previous: optional result for an earlier version of the
+            document; only what changed since is checked again
+        :param changed: optional paths of the values that changed since
+            ``previous``, see
+            :func:`validictory.incremental.validate_incremental`
+        '''
+        from validictory.incremental import validate_incremental
+        return validate_incremental(self, data, schema, previous, changed)
+
+    def validate_multiple(self, data, schemas):
+        '''
+        Validates a piece of json data against several json-schemas (or
+        fragments of them, given with the path of the value they describe)
+        in a single walk, collecting every error like :meth:`iter_errors`,
+        and returns a :class:`~validictory.multi.SchemaResult` per schema,
+        see :func:`validictory.multi.validate_multiple`.
+        '''
+        from validictory.multi import validate_multiple
+        return validate_multiple(self, data, schemas)
+
+    def validate_async(self, data, schema, **options):
+        '''
+        Returns a coroutine validating a piece of json data against the
+        provided json-schema while letting an asyncio event loop run other
+        tasks, see :func:`validictory.aio.validate` for the options.
+        Python 3.5 or later only.
+        '''
+        if sys.version_info < (3, 5):
+            raise NotImplementedError("validate_async needs Python 3.5 or later")
+        from validictory.aio import validate
+        return validate(self, data, schema, **options)
+
+    def _iter_errors(self, fieldname, data, schema, location, path):
+        # yields the errors of a node and the generators yielding those of
+        # its children, see _run_entries
+        if schema is None:
+            return
+        if not isinstance(schema, CompiledSchema) or schema.validator is not self:
+            schema = self.compile(schema)
+
+        memo = self.memo
+        if memo is None or self.sample is not None:
+            yield self._iter_checks(fieldname, data, schema, location, path)
+            return
+
+        memo.enter()
+        try:
+            key = memo.key(schema, data, fieldname)
+            if key is not None and memo.passed(key):
+                return
+            found = yield self._iter_checks(fieldname, data, schema, location, path)
+            if key is not None and not found:
+                memo.add(key)
+        finally:
+            memo.leave()
+
+    def _iter_checks(self, fieldname, data, schema, location, path, descent=None):
+        if fieldname == FIELD_WILDCARD:
+            fields = [(name, path[:-1] + (name,)) for name in data]
+        else:
+            fields = [(fieldname, path)]
+
+        for fieldname, fieldpath in fields:
+            for keyword, validator, value, wants_location in schema.checks:
+                walker = _ITERATED_KEYWORDS.get(keyword)
+                if walker is not None:
+                    yield getattr(self, walker)(data, fieldname, schema, value, location,
+                                                fieldpath, descent)
+                    continue
+                try:
+                    if wants_location:
+                        validator(data, fieldname, schema, value, location)
+                    else:
+                        validator(data, fieldname, schema, value)
+                except ValidationError as e:
+                    yield ErrorRecord(fieldpath, keyword, data.get(fieldname), e)
+
+    # The _iter_* walkers below yield what iter_errors finds for the keywords
+    # descending into subschemas. They go down into each child through a
+    # descent, the validator itself unless another is given (see
+    # validictory.multi): they yield the generator its _child_entries
+    # returns for a child, whose value is given in place of the field with
+    # None in place of the object for an array item or patternProperties
+    # value, and are sent back the number of entries it gave (see
+    # _run_entries). Its _item_indices picks the items of an array to walk,
+    # and its _sampled_entries returns the entries to yield once the sampled
+    # items were walked, given the number of entries of each as (index,
+    # count) pairs.
+
+    def _child_entries(self, fieldname, data, schema, location, path):
+        if data is None:
+            fieldname, data = "config", {"config": fieldname}
+        return self._iter_errors(fieldname, data, schema, location, path)
+
+    def _sampled_entries(self, items, length, sampled, children):
+        failed = [index for index, count in children if count]
+        self.sample.record(items.path, length, sampled, failed)
+        return ()
+
+    def _not_object(self, keyword, x, fieldname, schema, value, location, path):
+        # the errors of a keyword describing an object when the field isn't
+        # one: none if its type or disallow already reports it, or else
+        # those validate finds
+        for check in schema.checks:
+            if check[0] in ('type', 'disallow'):
+                try:
+                    if check[3]:
+                        check[1](x, fieldname, schema, check[2], location)
+                    else:
+                        check[1](x, fieldname, schema, check[2])
+                except ValidationError:
+                    return []
+        try:
+            getattr(self, 'validate_' + keyword)(x, fieldname, schema, value)
+        except ValidationError as e:
+            return [ErrorRecord(path, keyword, x.get(fieldname), e)]
+        return []
+
+    def _iter_properties(self, x, fieldname, schema, properties, location, path,
+                         descent=None):
+        if descent is None:
+            descent = self
+        value = x.get(fieldname)
+        if isinstance(value, dict):
+            if not isinstance(properties, dict):
+                raise SchemaError("Properties definition of field '%s' is not an object" % fieldname)
+            location = location + "." + fieldname
+            for eachProp in properties:
+                yield descent._child_entries(eachProp, value, properties.get(eachProp),
+                                             location, path + (eachProp,))
+
+    def _iter_items(self, x, fieldname, schema, items, location, path, descent=None):
+        if descent is None:
+            descent = self
+        value = x.get(fieldname)
+        if not isinstance(value, (list, tuple)):
+            return
+        sampled = None
+        if isinstance(items, (list, tuple)):
+            if not 'additionalItems' in schema and len(items) != len(value):
+                yield ErrorRecord(path, 'items', value, ValidationError(
+                    fieldname=fieldname, value=value, desc=_LENGTH_MISMATCH,
+                    params={'value': value, 'fieldname': fieldname}))
+                return
+            pairs = zip(range(len(items)), value, items)
+        elif isinstance(items, dict):
+            indices, sampled = descent._item_indices(value, items)
+            pairs = ((index, value[index], items) for index in indices)
+        else:
+            raise SchemaError("Properties definition of field '%s' is not a list or an object" % fieldname)
+        children = []
+        for index, eachItem, itemschema in pairs:
+            found = yield descent._child_entries(eachItem, None, itemschema, "", path + (index,))
+            if sampled is not None:
+                children.append((index, found))
+        if sampled is not None:
+            for entry in descent._sampled_entries(items, len(value), sampled, children):
+                yield entry
+
+    def _iter_patternProperties(self, x, fieldname, schema, patternproperties,
+                                location, path, descent=None):
+        if descent is None:
+            descent = self
+        if patternproperties == None:
+            patternproperties = {}
+        if not isinstance(patternproperties, PatternSet):
+            patternproperties = PatternSet(patternproperties)
+
+        obj = x.get(fieldname)
+        if not isinstance(obj, dict):
+            for entry in self._not_object('patternProperties', x, fieldname, schema,
+                                          patternproperties, location, path):
+                yield entry
+            return
+        matched = [[] for _ in patternproperties.pairs]
+        for key, value in obj.items():
+            for index in patternproperties.match(key):
+                matched[index].append((key, value))
+
+        for (pattern, schema), values in zip(patternproperties.pairs, matched):
+            for key, value in values:
+                yield descent._child_entries(value, None, schema, "", path + (key,))
+
+    def _iter_additionalProperties(self, x, fieldname, schema, additionalProperties,
+                                   location, path, descent=None):
+        if descent is None:
+            descent = self
+        if isinstance(additionalProperties, bool) and additionalProperties:
+            return
+        if not isinstance(additionalProperties, (dict, bool)):
+            raise SchemaError("additionalProperties schema definition for field '%s' is not an object" % fieldname)
+
+        value = x.get(fieldname)
+        if not isinstance(value, dict):
+            for entry in self._not_object('additionalProperties', x, fieldname, schema,
+                                          additionalProperties, location, path):
+                yield entry
+            return
+        properties = schema.get("properties")
+        if properties is None:
+            properties = {}
+        for eachProperty in value:
+            if eachProperty not in properties:
+                if isinstance(additionalProperties, bool):
+                    yield ErrorRecord(path + (eachProperty,), 'additionalProperties',
+                                      value[eachProperty], eachProperty)
+                    continue
+                yield descent._child_entries(eachProperty, value, additionalProperties,
+                                             "", path + (eachProperty,))
+
+
+# keywords whose subschemas iter_errors descends into itself, so that an
+# error in one child doesn't hide the errors of its siblings
+_ITERATED_KEYWORDS = {
+    'properties': '_iter_properties',
+    'items': '_iter_items',
+    'patternProperties': '_iter_patternProperties',
+    'additionalProperties': '_iter_additionalProperties',
+}
+
+
+_SERIALS = itertools.count()
+
+_SUBSCHEMA_MAPS = ('properties', 'patternProperties')
+_SUBSCHEMA_LISTS = ('items', 'type', 'disallow')
+_SUBSCHEMAS = ('additionalItems', 'additionalProperties')
+
+
+def _subschemas(compiled):
+    # the compiled schemas nested directly in a compiled schema
+    for keyword, value in compiled.items():
+        if keyword in _SUBSCHEMA_MAPS and isinstance(value, dict):
+            values = value.values()
+        elif keyword in _SUBSCHEMA_LISTS and isinstance(value, (list, tuple)):
+            values = value
+        elif keyword in _SUBSCHEMA_LISTS or keyword in _SUBSCHEMAS:
+            values = (value,)
+        else:
+            continue
+        for value in values:
+            if isinstance(value, CompiledSchema):
+                yield value
+
+
+def _measure_depth(root):
+    # sets the depth of root and of the schemas below it whose depth isn't
+    # known yet, walking them on an explicit stack; a schema met again
+    # while its own subschemas are walked holds itself
+    walking = set([id(root)])
+    stack = [(root, _subschemas(root), [0])]
+    while stack:
+        node, children, deepest = stack[-1]
+        for child in children:
+            if child._depth is not None:
+                deepest[0] = max(deepest[0], child._depth)
+            elif id(child) in walking:
+                deepest[0] = float('inf')
+            else:
+                walking.add(id(child))
+                stack.append((child, _subschemas(child), [0]))
+                break
+        else:
+            stack.pop()
+            walking.discard(id(node))
+            node._depth = deepest[0] + 1
+            if stack:
+                parent = stack[-1][2]
+                parent[0] = max(parent[0], node._depth)
+
+_GENERATOR = type((lambda: (yield))())
+
+# schemas nested deeper than this are validated on an explicit stack (see
+# validictory.iterative), shallower ones recursively, which is faster
+RECURSION_DEPTH = 50
+
+
+# yielded by a step that only lets whoever runs it know that it is still
+# busy (see validictory.aio), and sent None back
+_PAUSE = object()
+
+
+def _run_steps(steps):
+    '''
+    Runs the generator ``steps`` on an explicit stack instead of the
+    python one. A step calls another by yielding its generator, and is
+    sent the value that generator yields last (or None), or has the
+    exception it raised thrown in.
+    '''
+    stack = [steps]
+    value = None
+    error = None
+    while stack:
+        try:
+            if error is not None:
+                step = stack[-1].throw(error)
+                error = None
+            else:
+                step = stack[-1].send(value)
+        except StopIteration:
+            stack.pop()
+            value = None
+            continue
+        except Exception as e:
+            stack.pop()
+            if not stack:
+                raise
+            error = e
+            value = None
+            continue
+        if type(step) is _GENERATOR:
+            stack.append(step)
+            value = None
+        elif step is _PAUSE:
+            value = None
+        else:
+            stack.pop().close()
+            value = step
+    return value
+
+
+def _run_entries(entries):
+    '''
+    Yields the entries of the generator ``entries``, running the
+    generators it yields in their place on an explicit stack instead of
+    nesting them on the python one. A generator that yielded another is
+    sent the number of entries that one gave, or has the exception it
+    raised thrown in.
+    '''
+    stack = [entries]
+    counts = [0]
+    value = None
+    error = None
+    try:
+        while stack:
+            try:
+                if error is not None:
+                    entry = stack[-1].throw(error)
+                    error = None
+                else:
+                    entry = stack[-1].send(value)
+                value = None
+            except StopIteration:
+                stack.pop()
+                value = counts.pop()
+                if counts:
+                    counts[-1] += value
+                continue
+            except Exception as e:
+                stack.pop()
+                counts.pop()
+                if not stack:
+                    raise
+                error = e
+                value = None
+                continue
+            if type(entry) is _GENERATOR:
+                stack.append(entry)
+                counts.append(0)
+            else:
+                counts[-1] += 1
+                yield entry
+    finally:
+        while stack:
+            stack.pop().close()
+
+
+class CompiledSchema(dict):
+    '''
+    A schema prepared by :meth:`SchemaValidator.compile`.
+
+    It is a dictionary holding the same keys as the original schema, with
+    the ``required`` and ``blank`` defaults filled in and nested schemas
+    compiled as well, so the ``validate_*`` methods see what they would
+    have seen before. The validator methods to run for the schema are
+    looked up once and kept in ``checks`` (the keywords that only concern
+    the schema, like ``title``, were checked when compiling and have none),
+    and ``path`` is the JSON pointer of the schema within the one that was
+    compiled.
+
+    ``checks`` are in the order of the schema, which decides which error is
+    reported when a value breaks several keywords. They are run in the
+    order of ``ordered_checks`` though, cheapest first, and only on failure
+    are the remaining ones that come earlier in the schema's order run to
+    find the error to report.
+    '''
+
+    def __init__(self, validator, schema, path="#"):
+        dict.__init__(self)
+        self.validator = validator
+        self.schema = schema
+        self._pointer = path
+        self.checks = ()
+        self.ordered_checks = ()
+        self._ranks = {}
+        self._columns = False
+        self._plan = None
+        self._depth = None
+        self.contextual = False
+        self._serial = next(_SERIALS)
+        self._key = None
+
+    @property
+    def path(self):
+        path = self._pointer
+        if isinstance(path, _Pointer):
+            path = self._pointer = str(path)
+        return path
+
+    def _reorder(self, cost):
+        positions = dict((check[0], index) for index, check in enumerate(self.checks))
+        self.ordered_checks = tuple(sorted(self.checks, key=lambda check:
+                                           (cost(check), positions[check[0]])))
+        self._ranks = dict((check[0], rank) for rank, check
+                           in enumerate(self.ordered_checks))
+
+    def _reference_error(self, data, fieldname, location, keyword, error):
+        # runs the checks that come before ``keyword`` in the schema's order
+        # but after it in the order they were run, returning the keyword and
+        # error of the first one that fails (or the original ones)
+        ranks = self._ranks
+        failed = ranks[keyword]
+        for check in self.checks:
+            if check[0] == keyword:
+                break
+            if ranks[check[0]] > failed:
+                _, validator, value, wants_location = check
+                try:
+                    if wants_location:
+                        validator(data, fieldname, self, value, location)
+                    else:
+                        validator(data, fieldname, self, value)
+                except Exception as e:
+                    return check[0], e
+        return keyword, error
+
+    def adapt(self, stats=None):
+        '''
+        Reorders the checks of this schema and of its subschemas so that
+        the ones failing most often, according to the
+        :class:`~validictory.profiling.ValidationStats` of the validator (or
+        ``stats``), run first, cheapest first among equals. The errors
+        reported don't change, only how soon they are found.
+        '''
+        if stats is None:
+            stats = self.validator.stats
+        if stats is None:
+            raise ValueError("no validation stats to adapt the schema to")
+
+        seen = set()
+        pending = [self]
+        while pending:
+            value = pending.pop()
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            if isinstance(value, CompiledSchema):
+                value._adapt(stats)
+            if isinstance(value, dict):
+                pending.extend(value.values())
+            elif isinstance(value, (list, tuple)):
+                pending.extend(value)
+
+    def _adapt(self, stats):
+        def cost(check):
+            entry = stats.paths.get(self.path + "/" + _escape_pointer(check[0]))
+            rate = 0.0
+            if entry and entry[0]:
+                rate = float(entry[2]) / entry[0]
+            return (-rate, _check_cost(check))
+        self._reorder(cost)
+
+    @property
+    def depth(self):
+        '''
+        Number of levels of this schema and its nested subschemas, infinite
+        for a schema holding itself.
+        '''
+        if self._depth is None:
+            _measure_depth(self)
+        return self._depth
+
+    @property
+    def columns(self):
+        '''
+        :class:`~validictory.columnar.ColumnarItems` used to check long
+        arrays of items against this schema a property at a time, or None
+        when the schema isn't suited to it.
+        '''
+        if self._columns is False:
+            from validictory import columnar
+            self._columns = columnar.prepare(self)
+        return self._columns
+
+    def validate(self, data, location="_data"):
+        '''
+        Validates a piece of json data against this schema.
+        '''
+        self.validator.validate(data, self, location)
+
+__all__ = ['SchemaValidator', 'CompiledSchema', 'ErrorRecord']